@@ -29,6 +29,7 @@
         'views/views.xml',
         'views/templates.xml',
         'views/ticket.xml',
+        'views/cron_ticket.xml',
         'views/state.xml',
         'views/states.xml',
         'views/point.xml',
@@ -40,12 +41,15 @@
         'security/view_users.xml', 
         'views/problem_def.xml',
         'views/ticket_dashboard_views.xml',
+        'views/analytics_job.xml',
         'views/avg_ticket.xml',
+        'views/ticket_fact.xml',
         'views/eda_std.xml',
         'views/eda_correlation.xml',
         'views/correlation_menu.xml',
         'views/intelligent_kmeans.xml',
         'views/normalization.xml',
+        'views/normalization_scaler.xml',
         'views/kmeans_result.xml',
         'views/kmeans_menu.xml',
         'views/about_program.xml',
@@ -65,6 +69,7 @@
             'tickets/static/src/js/ticket_dashboard.js',
             'tickets/static/src/js/correlation_dashboard.js',
             'tickets/static/src/js/kmeans_scatter_plot.js',
+            'tickets/static/src/js/job_progress_field.js',
             'tickets/static/lib/chartjs/chart.umd.js',
             'tickets/static/lib/datalabels/chartjs-plugin-datalabels.min.js',
             'tickets/static/lib/chartjsmatrix/chartjs-chart-matrix.min.js',
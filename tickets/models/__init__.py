@@ -2,6 +2,7 @@
 
 from . import models
 from . import ticket
+from . import ticket_fact
 from . import description
 from . import state
 from . import point
@@ -9,10 +10,13 @@ from . import point_transaction
 from . import contact_inherit
 from . import problem
 from . import problem_def
+from . import analytics_job
 from . import avg_ticket
+from . import analytics_snapshot
 from . import eda_std
 from . import eda_correlation
 from . import normalization
+from . import normalization_scaler
 from . import kmeans_result
 from . import intelligent_kmeans
 from . import about_program
\ No newline at end of file
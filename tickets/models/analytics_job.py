@@ -0,0 +1,183 @@
+# tickets/models/analytics_job.py
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import config
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+JOB_STATES = [
+    ('queued', 'Queued'),
+    ('running', 'Running'),
+    ('done', 'Done'),
+    ('failed', 'Failed'),
+]
+
+# Dipakai bila limit_time_real(_cron) tidak dibatasi (<= 0)
+DEFAULT_JOB_TIMEOUT = 6 * 3600
+
+
+def _cron_time_limit():
+    """Real-time limit (seconds) of a cron worker, 0 when unlimited."""
+    limit = config['limit_time_real_cron'] if config['limit_time_real_cron'] > 0 else config['limit_time_real']
+    return max(limit, 0)
+
+
+class AnalyticsJob(models.Model):
+    _name = 'analytics.job'
+    _description = 'Background Analytics Job'
+    _order = 'id desc'
+
+    name = fields.Char(string='Job', required=True, readonly=True)
+    model_name = fields.Char(string='Model', required=True, readonly=True)
+    res_id = fields.Integer(string='Record ID', readonly=True, help="0 for model-level methods.")
+    method_name = fields.Char(string='Method', required=True, readonly=True)
+    user_id = fields.Many2one('res.users', string='Requested By', readonly=True,
+                              default=lambda self: self.env.user)
+    state = fields.Selection(JOB_STATES, string='Status', default='queued', required=True, readonly=True, index=True)
+    progress = fields.Float(string='Progress (%)', readonly=True)
+    date_queued = fields.Datetime(string='Queued At', default=fields.Datetime.now, readonly=True)
+    date_started = fields.Datetime(string='Started At', readonly=True)
+    date_finished = fields.Datetime(string='Finished At', readonly=True)
+    duration = fields.Float(string='Duration (Seconds)', readonly=True)
+    error_message = fields.Text(string='Error', readonly=True)
+
+    # ========= Queue =========
+    @api.model
+    def enqueue(self, records, method_name, name=None):
+        """Queue `records.method_name()` (records may be an empty recordset for @api.model methods)."""
+        res_id = records.id if len(records) == 1 else 0
+        job = self.create({
+            'name': name or f"{records._name}.{method_name}",
+            'model_name': records._name,
+            'res_id': res_id,
+            'method_name': method_name,
+        })
+        # Jalankan runner secepatnya, tidak perlu menunggu interval cron
+        self.env.ref('tickets.ir_cron_analytics_job_runner')._trigger()
+        _logger.info(f"Queued analytics job {job.id}: {job.name}")
+        return job
+
+    @api.model
+    def _reap_stale_jobs(self):
+        """
+        Mark as failed the running jobs whose worker can no longer be alive:
+        started longer ago than the cron time limit (plus a minute), i.e. killed
+        by limit_time_real_cron, a restart or an OOM. Returns the number reaped.
+        """
+        timeout = (_cron_time_limit() + 60) if _cron_time_limit() else DEFAULT_JOB_TIMEOUT
+        cutoff = fields.Datetime.now() - timedelta(seconds=timeout)
+        self.flush_model(['state', 'date_started'])
+        self.env.cr.execute("""
+            UPDATE analytics_job
+               SET state = 'failed',
+                   date_finished = (now() at time zone 'UTC'),
+                   error_message = %s
+             WHERE state = 'running' AND date_started < %s
+         RETURNING id
+        """, (f"Job did not finish within {timeout} seconds (worker killed or restarted).", cutoff))
+        reaped = [row[0] for row in self.env.cr.fetchall()]
+        if reaped:
+            self.invalidate_model(['state', 'date_finished', 'error_message'])
+            _logger.warning(f"Analytics jobs {reaped} marked as failed: still running after {timeout}s.")
+        return len(reaped)
+
+    @api.model
+    def _cron_run_jobs(self, limit=5, time_budget=None):
+        """
+        Cron entry point: reap dead jobs, then run up to `limit` queued jobs,
+        one transaction each. No new job is started once the time budget
+        (default: half the cron time limit) is spent; the cron is then
+        re-triggered right away if jobs are still queued.
+        """
+        if time_budget is None:
+            time_budget = max(_cron_time_limit() / 2.0, 10.0) if _cron_time_limit() else None
+        deadline = time.time() + time_budget if time_budget else None
+        self._reap_stale_jobs()
+        self.env.cr.commit()
+        for _i in range(limit):
+            if deadline and time.time() >= deadline:
+                if self.search_count([('state', '=', 'queued')]):
+                    _logger.info("Analytics job runner: time budget reached, re-triggering for the remaining jobs.")
+                    self.env.ref('tickets.ir_cron_analytics_job_runner')._trigger()
+                break
+            self.env.cr.execute("""
+                SELECT id FROM analytics_job
+                 WHERE state = 'queued'
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            self.browse(row[0])._run()
+
+    def _run(self):
+        self.ensure_one()
+        self.write({'state': 'running', 'progress': 0.0, 'date_started': fields.Datetime.now()})
+        self.env.cr.commit()
+        started = time.time()
+        try:
+            target = self.env[self.model_name].with_user(self.user_id).with_context(analytics_job_id=self.id)
+            if self.res_id:
+                target = target.browse(self.res_id)
+            getattr(target, self.method_name)()
+            # Commit hasil dulu; progress ditulis cursor lain, jadi status akhir ditulis di transaksi baru
+            self.env.cr.commit()
+            self.write({
+                'state': 'done',
+                'progress': 100.0,
+                'date_finished': fields.Datetime.now(),
+                'duration': time.time() - started,
+            })
+            _logger.info(f"Analytics job {self.id} done in {time.time() - started:.1f}s.")
+        except Exception as e:
+            self.env.cr.rollback()
+            _logger.exception(f"Analytics job {self.id} failed.")
+            self.write({
+                'state': 'failed',
+                'date_finished': fields.Datetime.now(),
+                'duration': time.time() - started,
+                'error_message': str(e),
+            })
+        self.env.cr.commit()
+
+    # ========= Progress =========
+    @api.model
+    def _report_progress(self, progress):
+        """Store progress of the running job (if any) in its own transaction so the UI sees it immediately."""
+        job_id = self.env.context.get('analytics_job_id')
+        if not job_id:
+            return
+        with self.pool.cursor() as cr:
+            cr.execute("UPDATE analytics_job SET progress = %s WHERE id = %s",
+                       (min(max(progress, 0.0), 100.0), job_id))
+
+
+class AnalyticsJobMixin(models.AbstractModel):
+    _name = 'analytics.job.mixin'
+    _description = 'Background Job State for Analytics Records'
+
+    job_id = fields.Many2one('analytics.job', string='Last Job', readonly=True, copy=False)
+    job_state = fields.Selection(related='job_id.state', string='Job Status')
+    job_progress = fields.Float(related='job_id.progress', string='Job Progress (%)')
+    job_date_started = fields.Datetime(related='job_id.date_started', string='Job Started')
+    job_date_finished = fields.Datetime(related='job_id.date_finished', string='Job Finished')
+    job_duration = fields.Float(related='job_id.duration', string='Job Duration (Seconds)')
+    job_error = fields.Text(related='job_id.error_message', string='Job Error')
+
+    def _queue_job(self, method_name, name):
+        self.ensure_one()
+        # Job yang worker-nya mati tidak boleh memblokir record ini selamanya
+        if self.job_id.state == 'running':
+            self.env['analytics.job'].sudo()._reap_stale_jobs()
+        if self.job_id.state in ('queued', 'running'):
+            raise UserError("A job is already queued or running for this record. Please wait until it finishes.")
+        self.job_id = self.env['analytics.job'].enqueue(self, method_name, name)
+        return True
+
+    def _report_progress(self, progress):
+        self.env['analytics.job']._report_progress(progress)
@@ -0,0 +1,193 @@
+# tickets/models/analytics_snapshot.py
+from odoo import api, fields, models
+import base64
+import io
+import json
+import logging
+import math
+
+_logger = logging.getLogger(__name__)
+
+# numpy is optional here: the feature matrix is stored as NPZ when available, JSON otherwise
+try:
+    import numpy as np
+    NUMPY_INSTALLED = True
+except ImportError:
+    _logger.warning("⚠️ Analytics snapshot: numpy not installed, feature matrix stored as JSON.")
+    NUMPY_INSTALLED = False
+
+
+class AnalyticsSnapshot(models.Model):
+    _name = 'analytics.snapshot'
+    _description = 'Shared Analytics Snapshot (EDA, Correlation, Normalization)'
+    _order = 'computed_at desc, id desc'
+    _rec_name = 'computed_at'
+
+    data_version = fields.Char(string='Data Version', readonly=True, index=True)
+    computed_at = fields.Datetime(string='Computed At', readonly=True)
+    ticket_count = fields.Integer(string='Tickets', readonly=True)
+    customer_count = fields.Integer(string='Customers', readonly=True)
+    # NPZ: customer_ids (int32) + X (float64, kolom FEATURE_FIELDS); JSON bila numpy tidak ada
+    feature_file = fields.Binary(string='Feature Matrix', attachment=True, readonly=True, copy=False)
+    feature_filename = fields.Char(string='Feature Matrix Filename', readonly=True, copy=False)
+    # {metric: {"n": .., "sum": .., "sumsq": ..}} over raw ticket values (for eda.std)
+    ticket_moments = fields.Text(string='Ticket Moments (JSON)', readonly=True)
+
+    # Kolom feature matrix per customer (sama dengan normalization.FIELDS_TO_NORMALIZE)
+    FEATURE_FIELDS = [
+        'ticket_count', 'avg_priority', 'avg_complexity',
+        'avg_response_time', 'avg_resolution_time', 'avg_rating', 'avg_point'
+    ]
+
+    # ========= Versioning =========
+    @api.model
+    def _current_data_version(self):
+        """
+        Cheap fingerprint of the snapshot inputs: row count + latest write_date
+        of ticket_name (ticket moments) and of avg_ticket (feature matrix), which
+        also changes without a ticket write (recompute_all, imported tickets).
+        """
+        self.env['ticket.name'].flush_model()
+        self.env['avg.ticket'].flush_model()
+        self.env.cr.execute("""
+            SELECT (SELECT COUNT(*) FROM ticket_name), (SELECT MAX(write_date) FROM ticket_name),
+                   (SELECT COUNT(*) FROM avg_ticket), (SELECT MAX(write_date) FROM avg_ticket)
+        """)
+        ticket_count, ticket_write, avg_count, avg_write = self.env.cr.fetchone()
+        return "%s:%s:%s:%s" % (ticket_count, ticket_write or '', avg_count, avg_write or '')
+
+    @api.model
+    def get_snapshot(self, force=False):
+        """
+        Return the current snapshot, rebuilding it only when ticket data
+        changed since it was computed (or when force=True).
+        """
+        version = self._current_data_version()
+        snapshot = self.search([], limit=1)
+        if snapshot and not force and snapshot.data_version == version and snapshot.feature_file:
+            _logger.info(f"Analytics snapshot is up to date (version {version}), reusing it.")
+            return snapshot
+
+        _logger.info(f"Rebuilding analytics snapshot (version {version})...")
+        vals = self._build_snapshot_vals()
+        vals.update({'data_version': version, 'computed_at': fields.Datetime.now()})
+        if snapshot:
+            snapshot.write(vals)
+        else:
+            snapshot = self.create(vals)
+        return snapshot
+
+    # ========= Build =========
+    @api.model
+    def _build_snapshot_vals(self):
+        customer_ids, rows = self._fetch_feature_matrix()
+        moments = self._fetch_ticket_moments()
+        vals = {
+            'ticket_count': moments.pop('total'),
+            'customer_count': len(customer_ids),
+            'ticket_moments': json.dumps(moments),
+        }
+        vals.update(self._encode_feature_matrix(customer_ids, rows))
+        return vals
+
+    @api.model
+    def _encode_feature_matrix(self, customer_ids, rows):
+        """feature_file/feature_filename values for the matrix (NPZ, or JSON without numpy)."""
+        if NUMPY_INSTALLED:
+            buf = io.BytesIO()
+            np.savez(buf, customer_ids=np.array(customer_ids, dtype=np.int32),
+                     X=np.array(rows, dtype=np.float64).reshape(-1, len(self.FEATURE_FIELDS)))
+            content, filename = buf.getvalue(), 'analytics_features.npz'
+        else:
+            content = json.dumps({'customer_ids': customer_ids, 'rows': rows}).encode()
+            filename = 'analytics_features.json'
+        return {'feature_file': base64.b64encode(content), 'feature_filename': filename}
+
+    @api.model
+    def _fetch_feature_matrix(self):
+        """Load FEATURE_FIELDS of every customer from avg_ticket in one SQL fetch."""
+        self.env['avg.ticket'].flush_model(['customer_id'] + self.FEATURE_FIELDS)
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (customer_id) customer_id, {columns}
+              FROM avg_ticket
+             WHERE customer_id IS NOT NULL
+          ORDER BY customer_id, id DESC
+        """.format(columns=", ".join(
+            "COALESCE(%s, 0)" % field for field in self.FEATURE_FIELDS)))
+        rows = self.env.cr.fetchall()
+        return [row[0] for row in rows], [list(row[1:]) for row in rows]
+
+    @api.model
+    def _fetch_ticket_moments(self):
+        """
+        Count, sum and sum of squares of each raw ticket metric used by eda.std,
+        in one aggregate over ticket_name. Population σ is derived from these.
+        """
+        EdaStd = self.env['eda.std']
+        AvgTicket = self.env['avg.ticket']
+        priority_case, params = AvgTicket._sql_case('t.priority', EdaStd.PRIORITY_MAP, 'prio')
+        complexity_case, complexity_params = AvgTicket._sql_case('t.complexity', EdaStd.COMPLEXITY_MAP, 'cplx')
+        rating_case, rating_params = AvgTicket._sql_case('t.customer_rating', EdaStd.RATING_MAP, 'rate')
+        params.update(complexity_params)
+        params.update(rating_params)
+        params.update({
+            'prio_keys': tuple(EdaStd.PRIORITY_MAP),
+            'cplx_keys': tuple(EdaStd.COMPLEXITY_MAP),
+            'rate_keys': tuple(EdaStd.RATING_MAP),
+        })
+
+        # metric -> (value expression, filter)
+        metrics = {
+            'response_times': ("COALESCE(t.response_time_hours, 0)", "TRUE"),
+            'resolution_times': ("EXTRACT(EPOCH FROM t.finish_date - t.progress_date) / 3600.0",
+                                 "t.progress_date IS NOT NULL AND t.finish_date IS NOT NULL"),
+            'min_points': ("COALESCE(t.min_point, 0)", "TRUE"),
+            'complexity_scores': (complexity_case, "t.complexity IN %(cplx_keys)s"),
+            'priority_scores': (priority_case, "t.priority IN %(prio_keys)s"),
+            'ratings': (rating_case, "t.customer_rating IN %(rate_keys)s"),
+        }
+        selects = []
+        for value, where in metrics.values():
+            selects += [
+                "COUNT(*) FILTER (WHERE %s)" % where,
+                "COALESCE(SUM((%s)::float8) FILTER (WHERE %s), 0)" % (value, where),
+                "COALESCE(SUM(((%s)::float8) ^ 2) FILTER (WHERE %s), 0)" % (value, where),
+            ]
+
+        self.env['ticket.name'].flush_model()
+        self.env.cr.execute(
+            "SELECT COUNT(*), %s FROM ticket_name t" % ", ".join(selects), params)
+        row = self.env.cr.fetchone()
+
+        moments = {'total': row[0]}
+        for i, metric in enumerate(metrics):
+            n, total, sumsq = row[1 + 3 * i:4 + 3 * i]
+            moments[metric] = {'n': n, 'sum': total, 'sumsq': sumsq}
+        return moments
+
+    # ========= Readers =========
+    def get_feature_matrix(self):
+        """
+        Return (customer_ids, rows) where each row follows FEATURE_FIELDS.
+        rows is a float64 ndarray for an NPZ snapshot, a list of lists for JSON.
+        """
+        self.ensure_one()
+        if not self.feature_file:
+            return [], []
+        content = base64.b64decode(self.feature_file)
+        if (self.feature_filename or '').endswith('.npz'):
+            with np.load(io.BytesIO(content)) as data:
+                return data['customer_ids'].tolist(), data['X']
+        data = json.loads(content)
+        return data.get('customer_ids', []), data.get('rows', [])
+
+    def get_pstdev(self, metric):
+        """Population standard deviation of one ticket metric (0.0 when n < 2)."""
+        self.ensure_one()
+        moment = json.loads(self.ticket_moments or '{}').get(metric)
+        if not moment or moment['n'] < 2:
+            return 0.0
+        n = moment['n']
+        mean = moment['sum'] / n
+        variance = max(moment['sumsq'] / n - mean * mean, 0.0)
+        return math.sqrt(variance)
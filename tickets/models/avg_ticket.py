@@ -1,7 +1,10 @@
-from odoo import api, fields, models
+from odoo import api, fields, models, tools
 from odoo.exceptions import UserError
 import logging
 
+_logger = logging.getLogger(__name__)
+
+
 class AvgTicket(models.Model):
     _name = 'avg.ticket'
     _description = 'Average Ticket Summary per Customer'
@@ -11,68 +14,142 @@ class AvgTicket(models.Model):
     customer_id = fields.Many2one('res.partner', string='Customer', required=True, index=True)
     customer_name = fields.Char(string='Customer', compute='_compute_customer_name', store=False)
     ticket_count = fields.Integer(string='Total Tickets', readonly=True)
-    avg_priority = fields.Float(string='Average Priority', readonly=True)
-    avg_complexity = fields.Float(string='Average Complexity', readonly=True)
-    avg_response_time = fields.Float(string='Average Response (Seconds)', readonly=True)
-    avg_resolution_time = fields.Float(string='Average Resolution (Seconds)', readonly=True)
-    avg_point = fields.Float(string='Average Point (min_point)', readonly=True)
-    avg_rating = fields.Float(string='Average Rating (1-5)', readonly=True)
+    avg_priority = fields.Float(string='Average Priority', compute='_compute_averages', store=True, readonly=True)
+    avg_complexity = fields.Float(string='Average Complexity', compute='_compute_averages', store=True, readonly=True)
+    avg_response_time = fields.Float(string='Average Response (Seconds)', compute='_compute_averages', store=True, readonly=True)
+    avg_resolution_time = fields.Float(string='Average Resolution (Seconds)', compute='_compute_averages', store=True, readonly=True)
+    avg_point = fields.Float(string='Average Point (min_point)', compute='_compute_averages', store=True, readonly=True)
+    avg_rating = fields.Float(string='Average Rating (1-5)', compute='_compute_averages', store=True, readonly=True)
     last_computed = fields.Datetime(string='Last Computed', readonly=True)
 
+    # === Running totals (diupdate incremental dari ticket.name) ===
+    sum_priority = fields.Float(string='Sum Priority', readonly=True)
+    sum_complexity = fields.Float(string='Sum Complexity', readonly=True)
+    sum_response_time = fields.Float(string='Sum Response (Seconds)', readonly=True)
+    valid_response_count = fields.Integer(string='Tickets With Response', readonly=True)
+    sum_resolution_time = fields.Float(string='Sum Resolution (Seconds)', readonly=True)
+    valid_resolution_count = fields.Integer(string='Tickets With Resolution', readonly=True)
+    sum_point = fields.Float(string='Sum Point (min_point)', readonly=True)
+    valid_point_count = fields.Integer(string='Tickets With Point', readonly=True)
+    sum_rating = fields.Float(string='Sum Rating', readonly=True)
+    valid_rating_count = fields.Integer(string='Tickets With Rating', readonly=True)
+
     PRIORITY_MAP = {'low': 1, 'medium': 2, 'high': 3}
     COMPLEXITY_MAP = {'none': 0, 'low': 1, 'medium': 1.5, 'high': 2}
     RATING_MAP = {'no': 0, 'worst': 1, 'bad': 2, 'medium': 3, 'good': 4, 'excellent': 5}
 
-    # === Hitung rata-rata untuk 1 customer ===
+    # Semua field running total, urutannya dipakai juga untuk delta
+    SUM_FIELDS = [
+        'ticket_count',
+        'sum_priority', 'sum_complexity',
+        'sum_response_time', 'valid_response_count',
+        'sum_resolution_time', 'valid_resolution_count',
+        'sum_point', 'valid_point_count',
+        'sum_rating', 'valid_rating_count',
+    ]
+
+    # avg field -> (sum field, count field)
+    AVG_FIELDS = {
+        'avg_priority': ('sum_priority', 'ticket_count'),
+        'avg_complexity': ('sum_complexity', 'ticket_count'),
+        'avg_response_time': ('sum_response_time', 'valid_response_count'),
+        'avg_resolution_time': ('sum_resolution_time', 'valid_resolution_count'),
+        'avg_point': ('sum_point', 'valid_point_count'),
+        'avg_rating': ('sum_rating', 'valid_rating_count'),
+    }
+
+    def init(self):
+        # MAX(write_date) ikut versi data analytics.snapshot
+        tools.create_index(self._cr, 'avg_ticket_write_date_index', self._table, ['write_date'])
+
+    @api.depends(*SUM_FIELDS)
+    def _compute_averages(self):
+        for rec in self:
+            for avg_field, (sum_field, count_field) in self.AVG_FIELDS.items():
+                count = rec[count_field]
+                rec[avg_field] = rec[sum_field] / count if count else 0
+
+    # === Kontribusi 1 tiket ke running total ===
+    @api.model
+    def _ticket_contribution(self, ticket):
+        """Return the running-total contribution of one ticket as a dict keyed by SUM_FIELDS."""
+        vals = dict.fromkeys(self.SUM_FIELDS, 0)
+        vals['ticket_count'] = 1
+        vals['sum_priority'] = self.PRIORITY_MAP.get(ticket.priority, 0)
+        vals['sum_complexity'] = self.COMPLEXITY_MAP.get(ticket.complexity, 0)
+
+        if ticket.submitted_date and ticket.progress_date:
+            delta = ticket.progress_date - ticket.submitted_date
+            vals['sum_response_time'] = delta.total_seconds()
+            vals['valid_response_count'] = 1
+
+        if ticket.progress_date and ticket.finish_date:
+            delta = ticket.finish_date - ticket.progress_date
+            vals['sum_resolution_time'] = delta.total_seconds()
+            vals['valid_resolution_count'] = 1
+
+        if ticket.min_point:
+            vals['sum_point'] = ticket.min_point
+            vals['valid_point_count'] = 1
+
+        if ticket.customer_rating:
+            vals['sum_rating'] = self.RATING_MAP.get(ticket.customer_rating, 0)
+            vals['valid_rating_count'] = 1
+
+        return vals
+
+    # === Terapkan delta per customer (1 write per customer) ===
+    @api.model
+    def _apply_ticket_deltas(self, deltas):
+        """
+        Apply running-total deltas computed by ticket.name.
+        `deltas` is {customer_id: {sum_field: delta}}; each distinct customer
+        gets exactly one write (or one create when it has no row yet).
+        """
+        deltas = {
+            customer_id: delta for customer_id, delta in deltas.items()
+            if customer_id and any(delta.values())
+        }
+        if not deltas:
+            return
+
+        now = fields.Datetime.now()
+        existing = self.search([('customer_id', 'in', list(deltas))])
+        seen = set()
+        for avg_rec in existing:
+            customer_id = avg_rec.customer_id.id
+            if customer_id in seen:
+                continue
+            seen.add(customer_id)
+            delta = deltas[customer_id]
+            vals = {field: avg_rec[field] + delta.get(field, 0) for field in self.SUM_FIELDS}
+            vals['last_computed'] = now
+            avg_rec.write(vals)
+
+        vals_list = []
+        for customer_id, delta in deltas.items():
+            if customer_id in seen:
+                continue
+            vals = {field: delta.get(field, 0) for field in self.SUM_FIELDS}
+            vals.update({'customer_id': customer_id, 'last_computed': now})
+            vals_list.append(vals)
+        if vals_list:
+            # context tambahan agar create() di avg.ticket tidak diblok oleh UserError
+            self.with_context(from_ticket_auto=True).create(vals_list)
+
+    # === Hitung ulang running total untuk 1 customer (repair path) ===
     def compute_avg_for_customer(self, customer_id):
+        """Rebuild the running totals of one customer from all of its tickets."""
         Ticket = self.env['ticket.name']
-        tickets = Ticket.search([('customer_name_id', '=', customer_id)])
-        if not tickets:
-            return {
-                'ticket_count': 0,
-                'avg_priority': 0,
-                'avg_complexity': 0,
-                'avg_response_time': 0,
-                'avg_resolution_time': 0,
-                'avg_point': 0,
-                'avg_rating': 0,
-            }
-
-        count = len(tickets)
-        total_priority = total_complexity = total_response = total_resolution = total_point = total_rating = 0
-        valid_response = valid_resolution = valid_point = valid_rating = 0
+        # Tiket yang belum dihitung (import SQL) ditambahkan oleh cron ticket.name
+        tickets = Ticket.search([('customer_name_id', '=', customer_id), ('analytics_counted', '=', True)])
+        totals = dict.fromkeys(self.SUM_FIELDS, 0)
 
         for t in tickets:
-            total_priority += self.PRIORITY_MAP.get(t.priority, 0)
-            total_complexity += self.COMPLEXITY_MAP.get(t.complexity, 0)
-
-            if t.submitted_date and t.progress_date:
-                delta = t.progress_date - t.submitted_date
-                total_response += delta.total_seconds()
-                valid_response += 1
-
-            if t.progress_date and t.finish_date:
-                delta = t.finish_date - t.progress_date
-                total_resolution += delta.total_seconds()
-                valid_resolution += 1
-
-            if t.min_point:
-                total_point += t.min_point
-                valid_point += 1
-
-            if t.customer_rating:
-                total_rating += self.RATING_MAP.get(t.customer_rating, 0)
-                valid_rating += 1
-
-        return {
-            'ticket_count': count,
-            'avg_priority': total_priority / count if count else 0,
-            'avg_complexity': total_complexity / count if count else 0,
-            'avg_response_time': total_response / valid_response if valid_response else 0,
-            'avg_resolution_time': total_resolution / valid_resolution if valid_resolution else 0,
-            'avg_point': total_point / valid_point if valid_point else 0,
-            'avg_rating': total_rating / valid_rating if valid_rating else 0,
-        }
+            for field, value in self._ticket_contribution(t).items():
+                totals[field] += value
+
+        return totals
 
     @api.depends('customer_id')
     def _compute_customer_name(self):
@@ -81,7 +158,15 @@ class AvgTicket(models.Model):
 
     # === Recompute semua customer (data lama / mass update) ===
     @api.model
-    def recompute_all(self):
+    def recompute_all(self, mode='sql'):
+        """
+        Rebuild avg.ticket for every customer that has tickets.
+        mode='sql' aggregates ticket_name in one grouped query and upserts the
+        results in the same statement; mode='orm' is the old per-customer loop.
+        """
+        if mode == 'sql':
+            return self._recompute_all_sql()
+
         Ticket = self.env['ticket.name']
         all_customers = Ticket.search([]).mapped('customer_name_id')
         created, updated = 0, 0
@@ -100,6 +185,95 @@ class AvgTicket(models.Model):
 
         return {'created': created, 'updated': updated}
 
+    @api.model
+    def _sql_case(self, column, mapping, prefix):
+        """Build a `CASE column WHEN .. THEN .. ELSE 0 END` expression (+ named params) from a score map."""
+        query = "CASE %s" % column
+        params = {}
+        for i, (key, value) in enumerate(mapping.items()):
+            query += " WHEN %%(%s_k%d)s THEN %%(%s_v%d)s" % (prefix, i, prefix, i)
+            params.update({'%s_k%d' % (prefix, i): key, '%s_v%d' % (prefix, i): value})
+        return query + " ELSE 0 END", params
+
+    @api.model
+    def _recompute_all_sql(self):
+        """Single-pass grouped aggregation over ticket_name, upserted in bulk."""
+        self.env['ticket.name'].flush_model()
+        self.flush_model()
+
+        priority_case, priority_params = self._sql_case('t.priority', self.PRIORITY_MAP, 'prio')
+        complexity_case, complexity_params = self._sql_case('t.complexity', self.COMPLEXITY_MAP, 'cplx')
+        rating_case, rating_params = self._sql_case('t.customer_rating', self.RATING_MAP, 'rate')
+
+        has_response = "t.submitted_date IS NOT NULL AND t.progress_date IS NOT NULL"
+        has_resolution = "t.progress_date IS NOT NULL AND t.finish_date IS NOT NULL"
+        has_point = "COALESCE(t.min_point, 0) != 0"
+        has_rating = "t.customer_rating IS NOT NULL"
+
+        # Kolom yang ditulis ke avg_ticket -> ekspresi SQL di atas CTE "agg"
+        columns = {field: "agg.%s" % field for field in self.SUM_FIELDS}
+        for avg_field, (sum_field, count_field) in self.AVG_FIELDS.items():
+            columns[avg_field] = "COALESCE(agg.%s::float / NULLIF(agg.%s, 0), 0)" % (sum_field, count_field)
+        columns.update({'last_computed': '%(now)s', 'write_uid': '%(uid)s', 'write_date': '%(now)s'})
+
+        insert_columns = dict(columns, customer_id='agg.customer_id', create_uid='%(uid)s', create_date='%(now)s')
+
+        query = """
+            WITH agg AS (
+                SELECT t.customer_name_id AS customer_id,
+                       COUNT(*) AS ticket_count,
+                       SUM({priority_case}) AS sum_priority,
+                       SUM({complexity_case}) AS sum_complexity,
+                       COALESCE(SUM(EXTRACT(EPOCH FROM t.progress_date - t.submitted_date))
+                                FILTER (WHERE {has_response}), 0) AS sum_response_time,
+                       COUNT(*) FILTER (WHERE {has_response}) AS valid_response_count,
+                       COALESCE(SUM(EXTRACT(EPOCH FROM t.finish_date - t.progress_date))
+                                FILTER (WHERE {has_resolution}), 0) AS sum_resolution_time,
+                       COUNT(*) FILTER (WHERE {has_resolution}) AS valid_resolution_count,
+                       COALESCE(SUM(t.min_point) FILTER (WHERE {has_point}), 0) AS sum_point,
+                       COUNT(*) FILTER (WHERE {has_point}) AS valid_point_count,
+                       COALESCE(SUM({rating_case}) FILTER (WHERE {has_rating}), 0) AS sum_rating,
+                       COUNT(*) FILTER (WHERE {has_rating}) AS valid_rating_count
+                  FROM ticket_name t
+                 WHERE t.customer_name_id IS NOT NULL
+                   AND t.analytics_counted IS TRUE
+              GROUP BY t.customer_name_id
+            ), upd AS (
+                UPDATE avg_ticket a
+                   SET {update_set}
+                  FROM agg
+                 WHERE a.customer_id = agg.customer_id
+             RETURNING a.customer_id
+            ), ins AS (
+                INSERT INTO avg_ticket ({insert_columns})
+                SELECT {insert_values}
+                  FROM agg
+                 WHERE NOT EXISTS (SELECT 1 FROM upd WHERE upd.customer_id = agg.customer_id)
+             RETURNING id
+            )
+            SELECT (SELECT COUNT(DISTINCT customer_id) FROM upd), (SELECT COUNT(*) FROM ins)
+        """
+        query = query.format(
+            priority_case=priority_case,
+            complexity_case=complexity_case,
+            rating_case=rating_case,
+            has_response=has_response,
+            has_resolution=has_resolution,
+            has_point=has_point,
+            has_rating=has_rating,
+            update_set=", ".join("%s = %s" % (col, expr) for col, expr in columns.items()),
+            insert_columns=", ".join(insert_columns),
+            insert_values=", ".join(insert_columns.values()),
+        )
+        params = dict(priority_params, **complexity_params, **rating_params)
+        params.update({'now': fields.Datetime.now(), 'uid': self.env.uid})
+        self.env.cr.execute(query, params)
+        updated, created = self.env.cr.fetchone()
+
+        self.invalidate_model()
+        _logger.info("avg.ticket SQL recompute — Created: %s, Updated: %s", created, updated)
+        return {'created': created, 'updated': updated}
+
     # === Manual refresh dari form (opsional) ===
     def action_refresh(self):
         for rec in self:
@@ -107,9 +281,9 @@ class AvgTicket(models.Model):
             vals.update({'last_computed': fields.Datetime.now()})
             rec.write(vals)
         return True
-    
-    @api.model
-    def create(self, vals):
+
+    @api.model_create_multi
+    def create(self, vals_list):
         """
         - Cegah create manual dari UI.
         - Tapi biarkan create dari kode atau recompute_all() tetap bisa.
@@ -120,12 +294,13 @@ class AvgTicket(models.Model):
             raise UserError("Record Average Ticket tidak bisa dibuat manual. Sistem akan membuatnya otomatis.")
 
         # Buat record baru
-        record = super(AvgTicket, self).create(vals)
+        records = super(AvgTicket, self).create(vals_list)
 
-        # Auto isi nilai avg biar tidak kosong
-        if record.customer_id:
-            vals = record.compute_avg_for_customer(record.customer_id.id)
-            vals.update({'last_computed': fields.Datetime.now()})
-            record.write(vals)
+        # Auto isi nilai avg biar tidak kosong (kalau running total belum diberikan)
+        for record, vals in zip(records, vals_list):
+            if record.customer_id and 'ticket_count' not in vals:
+                totals = record.compute_avg_for_customer(record.customer_id.id)
+                totals.update({'last_computed': fields.Datetime.now()})
+                record.write(totals)
 
-        return record
\ No newline at end of file
+        return records
@@ -0,0 +1,77 @@
+# tickets/models/dashboard_cache.py
+from collections import OrderedDict
+import logging
+import threading
+
+_logger = logging.getLogger(__name__)
+
+# Jumlah maksimum response dashboard yang disimpan per proses
+DASHBOARD_CACHE_SIZE = 256
+
+
+class DashboardCache(object):
+    """
+    Process-wide LRU cache of ticket dashboard responses.
+
+    Keys start with (dbname, start_date, end_date); the rest of the key
+    (sort order, top N, access scope) is up to the caller. Each entry also
+    stores the data fingerprint it was computed for, so a stale entry is
+    never served even when the invalidation happened in another worker.
+    """
+
+    def __init__(self, max_size=DASHBOARD_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, fingerprint):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != fingerprint:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, fingerprint, value):
+        with self._lock:
+            self._entries[key] = (fingerprint, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate_days(self, dbname, days):
+        """Drop the entries of `dbname` whose date range contains one of `days` (YYYY-MM-DD strings)."""
+        days = sorted(days)
+        if not days:
+            return 0
+        with self._lock:
+            stale = [
+                key for key in self._entries
+                if key[0] == dbname and any(key[1] <= day <= key[2] for day in days)
+            ]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+        if stale:
+            _logger.debug(f"Dashboard cache: invalidated {len(stale)} entries for {days[0]}..{days[-1]}.")
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+dashboard_cache = DashboardCache()
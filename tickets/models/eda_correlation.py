@@ -17,6 +17,7 @@ class EDACorrelation(models.Model):
 
     calculation_date = fields.Datetime(
         string='Calculation Date', default=fields.Datetime.now, readonly=True)
+    data_version = fields.Char(string='Data Version', readonly=True)
 
     # === Define all 21 correlation fields ===
     corr_ticket_priority = fields.Float(
@@ -68,29 +69,17 @@ class EDACorrelation(models.Model):
         'Corr(Avg Point vs Avg Rating)', digits=(6, 3))
 
     # === [PRIVATE METHOD] Logic for Calculating the Matrix ===
-    def _calculate_matrix(self):
+    def _calculate_matrix(self, snapshot=None):
         """Calculates the Pearson correlation matrix and returns a dictionary of results."""
-        AvgTicket = self.env['avg.ticket']
-        # Fetch necessary average data per customer
-        avg_data = AvgTicket.search_read([], fields=[
-            'ticket_count', 'avg_priority', 'avg_complexity',
-            'avg_response_time', 'avg_resolution_time',
-            'avg_point', 'avg_rating'
-        ])
-
-        if not avg_data:
+        # Per-customer averages come from the shared analytics snapshot
+        snapshot = snapshot or self.env['analytics.snapshot'].get_snapshot()
+        customer_ids, rows = snapshot.get_feature_matrix()
+
+        if not customer_ids:
             return False  # Return False if no average data exists
 
         # Convert to Pandas DataFrame
-        df = pd.DataFrame([{
-            'ticket_count': rec['ticket_count'],
-            'avg_priority': rec['avg_priority'],
-            'avg_complexity': rec['avg_complexity'],
-            'avg_response_time': rec['avg_response_time'],
-            'avg_resolution_time': rec['avg_resolution_time'],
-            'avg_point': rec['avg_point'],
-            'avg_rating': rec['avg_rating'],
-        } for rec in avg_data])
+        df = pd.DataFrame(rows, columns=snapshot.FEATURE_FIELDS)
 
         if df.empty:
             return False  # Return False if DataFrame is empty
@@ -139,23 +128,28 @@ class EDACorrelation(models.Model):
 
             'corr_point_rating': safe_corr('avg_point', 'avg_rating'),
             'calculation_date': fields.Datetime.now(),  # Record calculation time
+            'data_version': snapshot.data_version,
         }
 
     # === [PUBLIC METHOD 1] Triggered by Odoo Action (SINGLETON WRITE) ===
     def compute_and_save_correlation(self, records=None):
-        vals = self._calculate_matrix()
-
-        if not vals:
-            raise ValidationError(
-                "No data found in 'avg.ticket' or data is empty. Cannot compute correlation.")
-
+        snapshot = self.env['analytics.snapshot'].get_snapshot()
         record = self.search([], limit=1, order='id asc')
 
-        if record:
+        # Skip recompute if ticket data has not changed since the last matrix
+        if record and record.data_version == snapshot.data_version:
+            vals = None
+        else:
+            vals = self._calculate_matrix(snapshot)
+            if not vals:
+                raise ValidationError(
+                    "No data found in 'avg.ticket' or data is empty. Cannot compute correlation.")
+
+        if record and vals:
             record.write(vals)
             self.search([('id', '!=', record.id)]).with_context(
                 skip_unlink_validation=True).unlink()
-        else:
+        elif not record:
             record = self.create(vals)
 
         # FORCE FORM REFRESH
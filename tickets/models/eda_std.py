@@ -1,5 +1,4 @@
 from odoo import models, fields, api
-import statistics
 from datetime import datetime
 from odoo.exceptions import ValidationError
 import logging
@@ -8,6 +7,7 @@ _logger = logging.getLogger(__name__)
 
 class EDATicketSTDStats(models.Model):
     _name = 'eda.std'
+    _inherit = ['analytics.job.mixin']
     _description = 'Global Standard Deviation Results (EDA History)'
     _order = 'calculation_date desc'
     _rec_name = 'calculation_date'
@@ -24,6 +24,7 @@ class EDATicketSTDStats(models.Model):
     std_min_point = fields.Float('STD Ticket Point Usage', readonly=True)
     std_complexity_score = fields.Float('STD Complexity Score (0–2)', readonly=True)
     std_rating_score = fields.Float('STD Rating Score (1–5)', readonly=True)
+    data_version = fields.Char('Data Version', readonly=True)
 
     # === MAPPING CONSTANTS ===
     COMPLEXITY_MAP = {'low': 1.0, 'medium': 1.5, 'high': 2.0, 'none': 0.0} # Tambahkan 'none' jika ada
@@ -45,97 +46,35 @@ class EDATicketSTDStats(models.Model):
                 'std_rating_score': 0.0,
             })
 
-    # === UTILITIES ===
-    @api.model
-    def _safe_pstdev(self, data):
-        """Hitung STD populasi dengan aman (return 0 kalau data < 2)."""
-        # Pastikan semua data adalah float
-        cleaned_data = [float(d) for d in data if d is not None]
-        if len(cleaned_data) < 2:
-            return 0.0
-        try:
-            return statistics.pstdev(cleaned_data)
-        except statistics.StatisticsError:
-            return 0.0
-
-    @api.model
-    def _gather_ticket_values(self):
-        """Ambil data mentah dari model ticket.name untuk dihitung STD-nya."""
-        Ticket = self.env['ticket.name']
-        
-        # Ambil semua tiket (sesuai logika asli Anda)
-        tickets = Ticket.search([])
-        _logger.info(f"Gathering data from {len(tickets)} tickets for STD calculation.")
-
-        response_times = []
-        resolution_times = []
-        min_points = []
-        complexity_scores = []
-        priority_scores = []
-        ratings = []
-
-        for t in tickets:
-            # ==========================================================
-            # PERBAIKAN: Hapus 'if t.field:' agar nilai 0.0 ikut terhitung.
-            # Gunakan 't.field or 0.0' untuk menangani nilai None/False.
-            # ==========================================================
-
-            # Response Time (dari field compute store=True Anda)
-            response_times.append(float(t.response_time_hours or 0.0))
-
-            # Resolution Time (hanya jika tiket sudah selesai)
-            if t.progress_date and t.finish_date:
-                delta = t.finish_date - t.progress_date
-                resolution_times.append(delta.total_seconds() / 3600.0)
-
-            # Ticket Usage Point
-            min_points.append(float(t.min_point or 0.0))
-            
-            # ==========================================================
-            # Akhir Perbaikan
-            # ==========================================================
-
-            # Complexity (konversi)
-            if t.complexity in self.COMPLEXITY_MAP:
-                complexity_scores.append(self.COMPLEXITY_MAP[t.complexity])
-
-            # Priority (konversi)
-            if t.priority in self.PRIORITY_MAP:
-                priority_scores.append(self.PRIORITY_MAP[t.priority])
-
-            # Rating (konversi)
-            if t.customer_rating in self.RATING_MAP:
-                ratings.append(self.RATING_MAP[t.customer_rating])
-
-        _logger.info(f"Data points collected: Response={len(response_times)}, Resolution={len(resolution_times)}, Points={len(min_points)}")
-
-        return {
-            'tickets': tickets,
-            'response_times': response_times,
-            'resolution_times': resolution_times,
-            'min_points': min_points,
-            'complexity_scores': complexity_scores,
-            'priority_scores': priority_scores,
-            'ratings': ratings,
-        }
-
     # === MAIN ACTION ===
+    def action_queue_recalculate_std(self):
+        """Queue action_recalculate_std as a background job (button on the form)."""
+        return self._queue_job('action_recalculate_std', "EDA: Recalculate STD")
+
     def action_recalculate_std(self):
         """Hitung STD baru dan buat record history baru."""
         _logger.info("Action 'action_recalculate_std' triggered.")
-        data = self._gather_ticket_values()
+        snapshot = self.env['analytics.snapshot'].get_snapshot()
+        self._report_progress(80)
 
-        if not data['tickets']:
+        if not snapshot.ticket_count:
             raise ValidationError("Tidak dapat menghitung STD: Tidak ada data tiket ditemukan di sistem.")
 
+        # Data tiket belum berubah sejak perhitungan terakhir -> pakai hasil lama
+        latest = self.search([], limit=1)
+        if latest and latest.data_version == snapshot.data_version:
+            _logger.info(f"Ticket data unchanged (version {snapshot.data_version}), reusing eda.std {latest.id}.")
+            return self._action_open_result(latest)
+
         std_values = {
-            'std_priority_score': self._safe_pstdev(data['priority_scores']),
-            'std_response_time': self._safe_pstdev(data['response_times']),
-            'std_resolution_time': self._safe_pstdev(data['resolution_times']),
-            'std_min_point': self._safe_pstdev(data['min_points']),
-            'std_complexity_score': self._safe_pstdev(data['complexity_scores']),
-            'std_rating_score': self._safe_pstdev(data['ratings']),
+            'std_priority_score': snapshot.get_pstdev('priority_scores'),
+            'std_response_time': snapshot.get_pstdev('response_times'),
+            'std_resolution_time': snapshot.get_pstdev('resolution_times'),
+            'std_min_point': snapshot.get_pstdev('min_points'),
+            'std_complexity_score': snapshot.get_pstdev('complexity_scores'),
+            'std_rating_score': snapshot.get_pstdev('ratings'),
             'calculation_date': fields.Datetime.now(),
+            'data_version': snapshot.data_version,
         }
         
         _logger.info(f"New STD values calculated: {std_values}")
@@ -146,6 +85,9 @@ class EDATicketSTDStats(models.Model):
         _logger.info(f"New eda.std record created with ID: {record.id}")
 
         # Mengembalikan action untuk membuka record baru yang baru saja dibuat
+        return self._action_open_result(record)
+
+    def _action_open_result(self, record):
         return {
             'type': 'ir.actions.act_window',
             'name': 'STD Calculation Result',
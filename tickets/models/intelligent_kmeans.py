@@ -1,16 +1,22 @@
 # tickets/models/intelligent_kmeans.py
-from odoo import api, fields, models
-from odoo.exceptions import UserError
+from odoo import api, fields, models, tools
+from odoo.exceptions import UserError, ValidationError
+import ast
 import logging
 import base64
 import io
+import json
+import os
+import re
+import tempfile
 
 _logger = logging.getLogger(__name__)
 
 # --- Try importing required libraries ---
 try:
-    from sklearn.cluster import KMeans
+    from sklearn.cluster import KMeans, MiniBatchKMeans
     from sklearn.metrics import silhouette_score, davies_bouldin_score
+    from joblib import Parallel, delayed, parallel_backend
     import numpy as np
     SKLEARN_INSTALLED = True
 except ImportError:
@@ -37,9 +43,100 @@ FEATURE_SELECTION = [
     ('norm_point', 'Z-Point'),
 ]
 FEATURE_DICT = dict(FEATURE_SELECTION) # Used for Centroid Table labels
+ENGINE_SELECTION = [
+    ('kmeans', 'KMeans (Full Batch)'),
+    ('minibatch', 'MiniBatchKMeans (Streaming)'),
+]
+SILHOUETTE_MODES = [
+    ('exact', 'Exact'),
+    ('sampled', 'Sampled'),
+    ('simplified', 'Simplified (Centroid-based)'),
+]
+CLUSTERING_MODES = [
+    ('full', 'Full (k-means++, 10 inits)'),
+    ('incremental', 'Incremental (Warm Start)'),
+]
+# Batas titik scatter plot per request (di atas ini data di-downsample)
+SCATTER_MAX_POINTS = 5000
+SCATTER_GRID_SIZE = 100
+STORAGE_MODES = [
+    ('rows', 'Rows (Z-Scores per Result)'),
+    ('compact', 'Compact (NPZ Attachment)'),
+]
+
+
+def simplified_silhouette_score(X, labels, centers):
+    """Centroid-based silhouette: a = distance to own centroid, b = to nearest other centroid. O(n·k)."""
+    distances = np.linalg.norm(X[:, np.newaxis, :] - centers[np.newaxis, :, :], axis=2)
+    rows = np.arange(len(X))
+    a = distances[rows, labels]
+    distances[rows, labels] = np.inf
+    b = distances.min(axis=1)
+    denom = np.maximum(a, b)
+    scores = np.divide(b - a, denom, out=np.zeros_like(a), where=denom > 0)
+    return float(scores.mean())
+
+
+def nearest_centroid(X, mean, std, centers):
+    """0-based nearest centroid of each raw feature row, after z = (x - μ) / σ. O(n·k) broadcasting."""
+    Z = (np.asarray(X, dtype=float) - mean) / std
+    return ((Z[:, np.newaxis, :] - centers[np.newaxis, :, :]) ** 2).sum(axis=2).argmin(axis=1)
+
+
+class AssignmentBuffer:
+    """
+    Disk-backed accumulator for the arrays of a compact run (normalization ids,
+    customer ids, 0-based labels, Z-Scores): each appended chunk goes to a
+    temporary file, so streaming runs keep O(batch) memory until the NPZ is written.
+    """
+    NAMES = ('norm_ids', 'customer_ids', 'labels', 'X')
+
+    def __init__(self):
+        self.dtypes = (np.int32, np.int32, np.int16, np.float32)
+        self.files = [tempfile.TemporaryFile() for _name in self.NAMES]
+        self.rows = 0
+
+    def append(self, parts):
+        for file, dtype, part in zip(self.files, self.dtypes, parts):
+            np.ascontiguousarray(part, dtype=dtype).tofile(file)
+        self.rows += len(parts[0])
+
+    def write_npz(self, fileobj, **extra):
+        """np.savez of the accumulated arrays, read back through memmaps (written in buffered blocks)."""
+        arrays = {}
+        for name, file, dtype in zip(self.NAMES, self.files, self.dtypes):
+            file.flush()
+            shape = (self.rows, len(FEATURE_SELECTION)) if name == 'X' else (self.rows,)
+            arrays[name] = np.memmap(file, dtype=dtype, mode='r', shape=shape) if self.rows else np.zeros(shape, dtype)
+        np.savez(fileobj, **arrays, **extra)
+
+    def close(self):
+        for file in self.files:
+            file.close()
+
+
+class FixedCentroids:
+    """Stand-in for a fitted sklearn model (n_clusters, cluster_centers_, predict) around given centroids."""
+
+    def __init__(self, centers):
+        self.cluster_centers_ = np.asarray(centers, dtype=float)
+        self.n_clusters = len(self.cluster_centers_)
+
+    def predict(self, X):
+        return nearest_centroid(X, 0.0, 1.0, self.cluster_centers_)
+
+
+def centroid_davies_bouldin_score(centers, intra_dists):
+    """Davies-Bouldin index from centroids + mean member distance per cluster (no full matrix needed)."""
+    centroid_dists = np.linalg.norm(centers[:, np.newaxis, :] - centers[np.newaxis, :, :], axis=2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = (intra_dists[:, np.newaxis] + intra_dists[np.newaxis, :]) / centroid_dists
+    ratios[~np.isfinite(ratios)] = 0.0
+    return float(ratios.max(axis=1).mean())
 
 class IntelligentKmeans(models.Model):
     _name = 'intelligent.kmeans'
+    _inherit = ['analytics.job.mixin']
     _description = 'Intelligent K-Means Control Panel'
     _rec_name = 'run_date'
 
@@ -48,17 +145,72 @@ class IntelligentKmeans(models.Model):
     # --- Step 1 Fields (Find Optimal K) ---
     k_min = fields.Integer(string='Min k', default=2, required=True)
     k_max = fields.Integer(string='Max k (inclusive)', default=10, required=True)
-    wcss_results = fields.Html(string='WCSS Results (Elbow)', readonly=True)
-    silhouette_results = fields.Html(string='Silhouette Results', readonly=True)
-    wcss_data = fields.Text(string='WCSS Data (Raw)', readonly=True)
-    silhouette_data = fields.Text(string='Silhouette Data (Raw)', readonly=True)
+    # {"k": [...], "wcss": [...], "silhouette": [...]}
+    sweep_data = fields.Text(string='K Sweep (JSON)', readonly=True, copy=False)
+    # Tampilan dirender dari sweep_data saat dibaca (tidak disimpan)
+    wcss_results = fields.Html(string='WCSS Results (Elbow)', compute='_compute_sweep_display')
+    silhouette_results = fields.Html(string='Silhouette Results', compute='_compute_sweep_display')
+    wcss_data = fields.Text(string='WCSS Data (Raw)', compute='_compute_sweep_display')
+    silhouette_data = fields.Text(string='Silhouette Data (Raw)', compute='_compute_sweep_display')
     elbow_chart = fields.Binary(string="Elbow Method Chart", readonly=True) 
+    sweep_workers = fields.Integer(
+        string='Sweep Workers', default=0,
+        help="Number of worker processes for the k sweep (one k per worker). 0 = one per CPU core.")
+
+    # --- Clustering Engine ---
+    engine = fields.Selection(ENGINE_SELECTION, string='Engine', default='kmeans', required=True,
+                              help="KMeans loads the whole Z-Score matrix in memory. MiniBatchKMeans streams "
+                                   "normalization.name in batches (partial_fit); its silhouette is always "
+                                   "computed on a sample or centroid-based.")
+    batch_size = fields.Integer(string='Batch Size', default=4096)
+    max_iterations = fields.Integer(string='Iterations (Epochs)', default=10,
+                                    help="Passes over normalization.name for MiniBatchKMeans.")
+
+    # --- Silhouette Scoring (exact is O(n²)) ---
+    silhouette_mode = fields.Selection(SILHOUETTE_MODES, string='Silhouette Mode', default='exact', required=True,
+                                       help="Exact: full pairwise silhouette. Sampled: exact silhouette on a fixed-seed "
+                                            "random sample. Simplified: distance to centroids only (O(n·k)).")
+    silhouette_sample_size = fields.Integer(string='Silhouette Sample Size', default=10000)
+    silhouette_seed = fields.Integer(string='Silhouette Sample Seed', default=42)
+    silhouette_mode_used = fields.Selection(SILHOUETTE_MODES, string='Silhouette Mode Used', readonly=True)
+    silhouette_sample_used = fields.Integer(string='Silhouette Sample Used', readonly=True)
 
     # --- Step 2 Fields (Final Clustering) ---
     chosen_k = fields.Integer(string='Chosen k', default=3, required=True, help="Select the best 'k'.")
-    final_centroids = fields.Html(string='Final Centroids (Z-Scores)', readonly=True)
+    final_centroids = fields.Html(string='Final Centroids (Z-Scores)', compute='_compute_final_centroids')
     final_silhouette = fields.Float(string='Final Silhouette Score', readonly=True)
     final_dbi = fields.Float(string='Final Davies-Bouldin Index', readonly=True)
+    final_inertia = fields.Float(string='Final Inertia (WCSS)', readonly=True)
+    # {"feature_names": [...], "centroids": [[...], ...], "sizes": [...], "inertia": ..} (urutan FEATURE_SELECTION)
+    centroid_data = fields.Text(string='Centroids (JSON)', readonly=True, copy=False)
+
+    # --- Incremental Re-clustering ---
+    clustering_mode = fields.Selection(CLUSTERING_MODES, string='Clustering Mode', default='full', required=True,
+        help="Incremental: seed KMeans with the centroids of 'Warm Start From' (single init) and only "
+             "reassign customers whose normalization row changed since that run.")
+    warm_start_run_id = fields.Many2one('intelligent.kmeans', string='Warm Start From', copy=False,
+        domain="[('centroid_data', '!=', False)]",
+        help="Previous run whose centroids and assignments seed the incremental run (may be this run).")
+    clustering_date = fields.Datetime(string='Clustered At', readonly=True, copy=False,
+        help="Start of the last final clustering; normalization rows written later count as changed.")
+    scaler_id = fields.Many2one('normalization.scaler', string='Normalization Scaler', readonly=True, copy=False,
+        help="Frozen μ/σ version the clustered Z-Scores were computed with.")
+    live_scoring = fields.Boolean(string='Used for Live Scoring', readonly=True, copy=False,
+        help="New/changed customers are assigned to this run's nearest centroid whenever their tickets change.")
+    incremental_changed = fields.Integer(string='Changed Customers', readonly=True, copy=False)
+    incremental_moved = fields.Integer(string='Moved Assignments', readonly=True, copy=False)
+
+    # --- Result Storage ---
+    storage_mode = fields.Selection(STORAGE_MODES, string='Result Storage', default='rows', required=True,
+                                    help="Rows: every kmeans.result keeps a copy of the 7 Z-Scores. Compact: results "
+                                         "only keep customer/cluster; Z-Scores + labels are stored once as a NumPy "
+                                         "archive (float32 / int16) and copied to the rows only on demand.")
+    assignment_file = fields.Binary(string='Assignments (NPZ)', attachment=True, readonly=True, copy=False)
+    assignment_filename = fields.Char(string='Assignments Filename', readonly=True, copy=False)
+    results_materialized = fields.Boolean(string='Z-Scores on Results', readonly=True, copy=False,
+                                          help="False when the Z-Scores of this run only exist in the NPZ attachment.")
+    assignment_synced_id = fields.Integer(string='NPZ Synced Up To Result', readonly=True, copy=False,
+        help="Highest kmeans.result id contained in the NPZ. Live-scored rows above it are folded in lazily.")
 
     # --- REMOVED Scatter Plot Feature Selection Fields from this model ---
     # scatter_x_feature = fields.Selection(...) # REMOVED
@@ -71,6 +223,85 @@ class IntelligentKmeans(models.Model):
     def _compute_result_count(self):
         for run in self: run.result_count = len(run.result_ids)
 
+    # --- Structured Metrics (JSON) -> HTML ---
+    @api.depends('sweep_data')
+    def _compute_sweep_display(self):
+        for run in self:
+            sweep = run.get_sweep()
+            pairs = list(zip(sweep['k'], sweep['wcss'], sweep['silhouette']))
+            run.wcss_results = ("<ul>" + "".join(f"<li><b>k={k}:</b> {w:.4f}</li>" for k, w, _s in pairs) + "</ul>") if pairs else False
+            run.silhouette_results = ("<ul>" + "".join(f"<li><b>k={k}:</b> {s:.4f}</li>" for k, _w, s in pairs) + "</ul>") if pairs else False
+            run.wcss_data = str(sweep['wcss']) if pairs else False
+            run.silhouette_data = str(sweep['silhouette']) if pairs else False
+
+    @api.depends('centroid_data')
+    def _compute_final_centroids(self):
+        for run in self:
+            info = run.get_centroid_info()
+            if not info.get('centroids'):
+                run.final_centroids = False
+                continue
+            sizes = info.get('sizes') or []
+            html_table = "<table class='table table-sm table-bordered'><thead><tr><th>Cluster</th>"
+            html_table += "<th>Size</th>" if sizes else ""
+            html_table += "".join([f"<th>{FEATURE_DICT.get(fn, fn)}</th>" for fn in info['feature_names']]) + "</tr></thead><tbody>" # Use FEATURE_DICT for labels
+            for i, center in enumerate(info['centroids']):
+                html_table += f"<tr><td><b>Cluster {i+1}</b></td>"
+                html_table += f"<td>{sizes[i]}</td>" if i < len(sizes) else ("<td></td>" if sizes else "")
+                html_table += "".join([f"<td>{val:.4f}</td>" for val in center]) + "</tr>"
+            html_table += "</tbody></table>"
+            run.final_centroids = html_table
+
+    def get_sweep(self):
+        """K sweep of this run as {'k': [...], 'wcss': [...], 'silhouette': [...]} (empty lists if none)."""
+        self.ensure_one()
+        sweep = json.loads(self.sweep_data or '{}')
+        return {key: sweep.get(key, []) for key in ('k', 'wcss', 'silhouette')}
+
+    def get_centroid_info(self):
+        """Final clustering of this run as {'feature_names', 'centroids', 'sizes', 'inertia'} ({} if none)."""
+        self.ensure_one()
+        return json.loads(self.centroid_data or '{}')
+
+    def init(self):
+        """Fill sweep_data/centroid_data of runs stored before they existed (old text/HTML columns)."""
+        cr = self._cr
+        if tools.column_exists(cr, self._table, 'wcss_data'):
+            cr.execute("""
+                SELECT id, k_min, wcss_data, silhouette_data FROM intelligent_kmeans
+                 WHERE sweep_data IS NULL AND wcss_data IS NOT NULL
+            """)
+            for run_id, k_min, wcss_text, sil_text in cr.fetchall():
+                try:
+                    wcss = [float(w) for w in ast.literal_eval(wcss_text)]
+                    silhouettes = [float(s) for s in ast.literal_eval(sil_text or '[]')]
+                except (ValueError, SyntaxError, TypeError):
+                    continue
+                sweep = {'k': list(range(k_min, k_min + len(wcss))), 'wcss': wcss, 'silhouette': silhouettes}
+                cr.execute("UPDATE intelligent_kmeans SET sweep_data = %s WHERE id = %s", (json.dumps(sweep), run_id))
+        if tools.column_exists(cr, self._table, 'final_centroids'):
+            cr.execute("""
+                SELECT id, final_centroids FROM intelligent_kmeans
+                 WHERE centroid_data IS NULL AND final_centroids IS NOT NULL
+            """)
+            feature_names = [f[0] for f in FEATURE_SELECTION]
+            for run_id, html in cr.fetchall():
+                # Baris tabel lama: <tr><td><b>Cluster i</b></td><td>z</td>...</tr>
+                centroids = [[float(v) for v in re.findall(r"<td>(-?[\d.]+(?:e[-+]?\d+)?)</td>", row)]
+                             for row in re.findall(r"<tr><td><b>Cluster \d+</b></td>(.*?)</tr>", html)]
+                if not centroids or any(len(c) != len(feature_names) for c in centroids):
+                    continue
+                cr.execute("UPDATE intelligent_kmeans SET centroid_data = %s WHERE id = %s",
+                           (json.dumps({'feature_names': feature_names, 'centroids': centroids}), run_id))
+
+    @api.constrains('batch_size', 'max_iterations')
+    def _check_minibatch_params(self):
+        for run in self:
+            if run.batch_size <= 0:
+                raise ValidationError("Batch Size harus lebih besar dari 0.")
+            if run.max_iterations <= 0:
+                raise ValidationError("Iterations (Epochs) harus lebih besar dari 0.")
+
     # --- Library Checks ---
     def _check_sklearn(self):
         if not SKLEARN_INSTALLED:
@@ -100,37 +331,195 @@ class IntelligentKmeans(models.Model):
         X = np.array(data_matrix)
         return X, record_map, feature_names
 
-    # --- Button Actions ---
+    def _iter_normalized_batches(self, batch_size=None):
+        """Yields (normalization ids, customer ids, X chunk) from normalization.name, keyset-paginated by id."""
+        batch_size = batch_size or self.batch_size
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        self.env['normalization.name'].flush_model()
+        query = """
+            SELECT id, customer_id, {columns}
+              FROM normalization_name
+             WHERE id > %s
+          ORDER BY id
+             LIMIT %s
+        """.format(columns=", ".join("COALESCE(%s, 0)" % fname for fname in feature_names))
+        last_id = 0
+        while True:
+            self.env.cr.execute(query, (last_id, batch_size))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield [r[0] for r in rows], [r[1] for r in rows], np.array([r[2:] for r in rows], dtype=float)
+
+    def _count_normalized_data(self, k):
+        """Row count of normalization.name, checked against k (streaming engine never loads X)."""
+        n_total = self.env['normalization.name'].search_count([])
+        if not n_total: raise UserError("No data found in 'normalization.name'. Run its 'Recompute All' first.")
+        if n_total < k: raise UserError(f"Not enough data ({n_total} records) for k={k}.")
+        return n_total
+
+    # --- MiniBatchKMeans (streaming) ---
+    def _fit_minibatch(self, k_values):
+        """Fits one MiniBatchKMeans per k with partial_fit, all k's sharing each streamed batch."""
+        batch_size = max(self.batch_size, max(k_values))  # first partial_fit needs >= k samples
+        models = [
+            MiniBatchKMeans(n_clusters=k, init="k-means++", random_state=42, batch_size=batch_size)
+            for k in k_values
+        ]
+        epochs = max(1, self.max_iterations)
+        for epoch in range(epochs):
+            _logger.info(f"MiniBatchKMeans: epoch {epoch + 1}/{epochs}...")
+            for _ids, _customers, X_chunk in self._iter_normalized_batches(batch_size):
+                for model in models:
+                    model.partial_fit(X_chunk)
+            # Fitting = 0-70% dari progress job
+            self._report_progress(70.0 * (epoch + 1) / epochs)
+        return models
+
+    def _evaluate_streaming(self, models, n_total, on_labels=None):
+        """
+        One pass over normalization.name for fitted models: WCSS, silhouette
+        (centroid-based, or exact on a fixed-seed Bernoulli sample) and
+        Davies-Bouldin from the centroids. on_labels(norm_ids, customer_ids, X, labels)
+        is called per chunk for models[0], so final results can be written as they stream.
+        Returns (wcss list, silhouette list, dbi list, silhouette used vals).
+        """
+        simplified = self.silhouette_mode == 'simplified'
+        sample_size = self.silhouette_sample_size if self.silhouette_sample_size > 0 else 10000
+        ratio = min(1.0, sample_size / n_total)
+        rng = np.random.RandomState(self.silhouette_seed)
+        wcss = [0.0] * len(models)
+        sil_sums = [0.0] * len(models)
+        intra_sums = [np.zeros(model.n_clusters) for model in models]
+        counts = [np.zeros(model.n_clusters) for model in models]
+        sample_chunks = []
+
+        for norm_ids, customer_ids, X_chunk in self._iter_normalized_batches():
+            for i, model in enumerate(models):
+                labels = model.predict(X_chunk)
+                distances = np.linalg.norm(X_chunk - model.cluster_centers_[labels], axis=1)
+                wcss[i] += float((distances ** 2).sum())
+                np.add.at(intra_sums[i], labels, distances)
+                np.add.at(counts[i], labels, 1)
+                if simplified and model.n_clusters > 1:
+                    sil_sums[i] += simplified_silhouette_score(X_chunk, labels, model.cluster_centers_) * len(X_chunk)
+                if on_labels and i == 0:
+                    on_labels(norm_ids, customer_ids, X_chunk, labels)
+            if not simplified:
+                sample_chunks.append(X_chunk[rng.random_sample(len(X_chunk)) < ratio])
+
+        sample = np.vstack(sample_chunks) if sample_chunks else np.empty((0, len(FEATURE_SELECTION)))
+        silhouettes, dbis = [], []
+        for i, model in enumerate(models):
+            if model.n_clusters < 2:
+                silhouettes.append(0)
+            elif simplified:
+                silhouettes.append(sil_sums[i] / n_total)
+            else:
+                sample_labels = model.predict(sample) if len(sample) else []
+                valid = 1 < len(set(sample_labels)) < len(sample)
+                silhouettes.append(silhouette_score(sample, sample_labels) if valid else 0)
+            intra = np.divide(intra_sums[i], counts[i], out=np.zeros_like(intra_sums[i]), where=counts[i] > 0)
+            dbis.append(centroid_davies_bouldin_score(model.cluster_centers_, intra))
+
+        used_vals = {
+            'silhouette_mode_used': 'simplified' if simplified else 'sampled',
+            'silhouette_sample_used': n_total if simplified else len(sample),
+        }
+        return wcss, silhouettes, dbis, used_vals
+
+    # --- Button Actions (queued, run by the analytics job cron) ---
+    def action_queue_find_optimal_k(self):
+        return self._queue_job('action_find_optimal_k', f"K-Means: Find Optimal K (Run {self.id})")
+
+    def action_queue_final_clustering(self):
+        if self.chosen_k <= 1: raise UserError("'Chosen k' must be greater than 1.")
+        return self._queue_job('action_run_final_clustering', f"K-Means: Final Clustering k={self.chosen_k} (Run {self.id})")
+
     def action_find_optimal_k(self):
         """Runs K-Means multiple times and generates Elbow plot."""
         self._check_sklearn()
-        X, record_map, feature_names = self._get_normalized_data()
-        if len(X) < self.k_max:
-             raise UserError(f"Not enough data ({len(X)} records) to test up to k={self.k_max}.")
-        wcss = []
-        silhouette_scores = []
         k_range = list(range(self.k_min, self.k_max + 1))
-        _logger.info(f"K-Means: Finding optimal k from {self.k_min} to {self.k_max}...")
-        for k in k_range:
-            kmeans = KMeans(n_clusters=k, init="k-means++", random_state=42, n_init=10)
-            labels = kmeans.fit_predict(X)
-            wcss.append(kmeans.inertia_)
-            if k > 1: silhouette_scores.append(silhouette_score(X, labels))
-            else: silhouette_scores.append(0)
+        _logger.info(f"K-Means: Finding optimal k from {self.k_min} to {self.k_max} ({self.engine})...")
+        if self.engine == 'minibatch':
+            n_total = self._count_normalized_data(self.k_max)
+            models = self._fit_minibatch(k_range)
+            wcss, silhouette_scores, _dbis, used_vals = self._evaluate_streaming(models, n_total)
+        else:
+            X, record_map, feature_names = self._get_normalized_data()
+            if len(X) < self.k_max:
+                 raise UserError(f"Not enough data ({len(X)} records) to test up to k={self.k_max}.")
+            self._report_progress(10)
+            wcss, silhouette_scores = self._sweep_k(X, k_range)
+            used_vals = self._silhouette_used_vals(len(X))
         _logger.info("Optimal k calculation finished.")
-        wcss_html = "<ul>" + "".join([f"<li><b>k={k}:</b> {w:.4f}</li>" for k, w in zip(k_range, wcss)]) + "</ul>"
-        sil_html = "<ul>" + "".join([f"<li><b>k={k}:</b> {s:.4f}</li>" for k, s in zip(k_range, silhouette_scores)]) + "</ul>"
+        self._report_progress(90)
         chart_base64 = self._generate_elbow_chart(k_range, wcss)
-        self.write({
-            'wcss_results': wcss_html,
-            'silhouette_results': sil_html,
-            'wcss_data': str(wcss),
-            'silhouette_data': str(silhouette_scores),
+        vals = {
+            'sweep_data': json.dumps({
+                'k': k_range,
+                'wcss': [float(w) for w in wcss],
+                'silhouette': [float(s) for s in silhouette_scores],
+            }),
             'elbow_chart': chart_base64 if chart_base64 else False,
             'run_date': fields.Datetime.now(),
-        })
+        }
+        vals.update(used_vals)
+        self.write(vals)
         return True
 
+    def _get_sweep_workers(self, task_count):
+        """Worker count for the k sweep: the configured value, capped by the number of k's."""
+        workers = self.sweep_workers if self.sweep_workers > 0 else (os.cpu_count() or 1)
+        return max(1, min(workers, task_count))
+
+    def _sweep_k(self, X, k_range):
+        """
+        Fits one KMeans per k in a process pool and scores each fit.
+        random_state is fixed per k, so the output matches the serial loop.
+        Returns (wcss list, silhouette list) in k_range order.
+        """
+        workers = self._get_sweep_workers(len(k_range))
+        _logger.info(f"K-Means: sweeping {len(k_range)} k values on {workers} worker(s)...")
+        # Satu thread per worker agar tidak oversubscribe CPU (OpenMP di KMeans)
+        with parallel_backend('loky', n_jobs=workers, inner_max_num_threads=1):
+            models = Parallel()(
+                delayed(KMeans(n_clusters=k, init="k-means++", random_state=42, n_init=10).fit)(X)
+                for k in k_range
+            )
+            self._report_progress(60)
+            if self.silhouette_mode == 'simplified':
+                scores = [self._score_silhouette(X, model.labels_, model.cluster_centers_)
+                          for model in models if model.n_clusters > 1]
+            else:
+                kwargs = self._silhouette_kwargs(len(X))
+                scores = Parallel()(
+                    delayed(silhouette_score)(X, model.labels_, **kwargs)
+                    for model in models if model.n_clusters > 1
+                )
+        scores = iter(scores)
+        wcss = [model.inertia_ for model in models]
+        silhouette_scores = [next(scores) if model.n_clusters > 1 else 0 for model in models]
+        return wcss, silhouette_scores
+
+    def _silhouette_kwargs(self, n_samples):
+        """silhouette_score kwargs for 'sampled' mode (only when it really subsamples)."""
+        if self.silhouette_mode == 'sampled' and 0 < self.silhouette_sample_size < n_samples:
+            return {'sample_size': self.silhouette_sample_size, 'random_state': self.silhouette_seed}
+        return {}
+
+    def _score_silhouette(self, X, labels, centers):
+        """Silhouette score using the configured mode."""
+        if self.silhouette_mode == 'simplified':
+            return simplified_silhouette_score(X, labels, centers)
+        return silhouette_score(X, labels, **self._silhouette_kwargs(len(X)))
+
+    def _silhouette_used_vals(self, n_samples):
+        """Mode + effective sample size, stored on the run for reproducibility."""
+        sample_size = self._silhouette_kwargs(n_samples).get('sample_size', n_samples)
+        return {'silhouette_mode_used': self.silhouette_mode, 'silhouette_sample_used': sample_size}
+
     def _generate_elbow_chart(self, k_range, wcss_list):
         """Creates Elbow Method plot using matplotlib."""
         self._check_matplotlib()
@@ -158,51 +547,525 @@ class IntelligentKmeans(models.Model):
         """Runs K-Means, evaluates, stores results in kmeans.result."""
         self._check_sklearn()
         if self.chosen_k <= 1: raise UserError("'Chosen k' must be greater than 1.")
-        _logger.info(f"K-Means: Running final clustering with k={self.chosen_k}...")
+        # Waktu mulai: baris normalization yang berubah setelah ini dianggap "changed" oleh run incremental berikutnya
+        started = fields.Datetime.now()
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        if self.clustering_mode == 'incremental':
+            _logger.info(f"K-Means: Running incremental clustering with k={self.chosen_k} from run {self.warm_start_run_id.id}...")
+            centroids, final_sil, final_dbi, used_vals = self._run_incremental_kmeans()
+        elif self.engine == 'minibatch':
+            _logger.info(f"K-Means: Running final clustering with k={self.chosen_k} ({self.engine})...")
+            centroids, final_sil, final_dbi, used_vals = self._run_final_minibatch()
+        else:
+            _logger.info(f"K-Means: Running final clustering with k={self.chosen_k} ({self.engine})...")
+            centroids, final_sil, final_dbi, used_vals = self._run_final_kmeans()
+        _logger.info(f"Final Evaluation: Silhouette={final_sil:.4f}, DBI={final_dbi:.4f}")
+        self._report_progress(95)
+        # Save evaluation results (HTML centroid table dirender dari centroid_data)
+        vals = {
+            'final_silhouette': final_sil,
+            'final_dbi': final_dbi,
+            'centroid_data': json.dumps({
+                'feature_names': feature_names,
+                'centroids': np.asarray(centroids).tolist(),
+                'sizes': self._cluster_sizes(len(centroids)),
+                'inertia': float(used_vals['final_inertia']),
+                # μ/σ dari Z-Score yang di-cluster, untuk scoring customer baru
+                'scaler': self._normalization_scaler(),
+            }),
+            'incremental_changed': 0,
+            'incremental_moved': 0,
+            'clustering_date': started,
+            'scaler_id': self.env['normalization.scaler'].get_current().id,
+            'run_date': fields.Datetime.now(),
+        }
+        vals.update(used_vals)
+        self.write(vals)
+        self.invalidate_recordset(['result_count'], self.ids) # Update smart button count
+        return True
+
+    def _normalization_scaler(self):
+        """
+        μ/σ behind the clustered Z-Scores, in FEATURE_SELECTION order: the current
+        frozen normalization.scaler, or (before any scaler exists) population
+        μ/σ (σ=0 -> 1) of the raw normalization.name values.
+        """
+        Normalization = self.env['normalization.name']
+        raw_fields = {norm: field for field, norm in Normalization.NORM_FIELD_MAP.items()}
+        field_names = [raw_fields[f[0]] for f in FEATURE_SELECTION]
+        scaler = self.env['normalization.scaler'].get_current()
+        if scaler:
+            params = scaler.get_params()
+            order = [params['fields'].index(field) for field in field_names]
+            return {
+                'fields': field_names,
+                'mean': [params['mean'][i] for i in order],
+                'std': [params['std'][i] for i in order],
+                'version': scaler.version,
+            }
+        Normalization.flush_model(field_names)
+        self.env.cr.execute("SELECT %s FROM normalization_name" % ", ".join(
+            "AVG(COALESCE({0}, 0)), STDDEV_POP(COALESCE({0}, 0))".format(field) for field in field_names))
+        row = self.env.cr.fetchone()
+        return {
+            'fields': field_names,
+            'mean': [float(value or 0.0) for value in row[0::2]],
+            'std': [float(value) if value and value > 1e-12 else 1.0 for value in row[1::2]],
+        }
+
+    def _cluster_sizes(self, k):
+        """Member count per cluster (index 0 = Cluster 1) from this run's kmeans.result rows."""
+        self.env['kmeans.result'].flush_model()
+        self.env.cr.execute("""
+            SELECT cluster_id, COUNT(*) FROM kmeans_result WHERE run_id = %s GROUP BY cluster_id
+        """, (self.id,))
+        sizes = [0] * k
+        for cluster_id, count in self.env.cr.fetchall():
+            if 1 <= cluster_id <= k:
+                sizes[cluster_id - 1] = count
+        return sizes
+
+    # --- Result Persistence (rows / compact) ---
+    def _persist_chunk(self, ResultModel, chunks, norm_ids, customer_ids, labels, X):
+        """
+        Bulk insert one chunk of assignments. In compact mode the rows are a
+        lightweight customer -> cluster lookup and the arrays go to the
+        AssignmentBuffer `chunks` for _store_assignments().
+        """
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        if self.storage_mode == 'compact':
+            ResultModel._bulk_insert(self.id, norm_ids, customer_ids, labels, None, feature_names)
+            chunks.append((
+                np.asarray(norm_ids, dtype=np.int32), np.asarray(customer_ids, dtype=np.int32),
+                np.asarray(labels, dtype=np.int16), np.asarray(X, dtype=np.float32),
+            ))
+        else:
+            ResultModel._bulk_insert(self.id, norm_ids, customer_ids, labels, X, feature_names)
+
+    def _store_assignments(self, chunks, synced_id=None):
+        """
+        Write the NPZ attachment of a compact run (or clear it for a rows run).
+        synced_id: last kmeans.result id the arrays reflect (default: the run's current maximum).
+        """
+        if synced_id is None:
+            self.env['kmeans.result'].flush_model()
+            self.env.cr.execute("SELECT COALESCE(MAX(id), 0) FROM kmeans_result WHERE run_id = %s", (self.id,))
+            synced_id = self.env.cr.fetchone()[0]
+        if self.storage_mode != 'compact':
+            chunks.close()
+            self.write({'assignment_file': False, 'assignment_filename': False, 'results_materialized': True,
+                        'assignment_synced_id': synced_id})
+            return
+        try:
+            with tempfile.TemporaryFile() as npz:
+                chunks.write_npz(npz, feature_names=np.array([f[0] for f in FEATURE_SELECTION]))
+                _logger.info(f"K-Means: stored {chunks.rows} assignments as NPZ ({npz.tell() / 1024:.1f} KiB).")
+                npz.seek(0)
+                content = npz.read()
+        finally:
+            chunks.close()
+        self.write({
+            'assignment_file': base64.b64encode(content),
+            'assignment_filename': f"kmeans_run_{self.id}.npz",
+            'results_materialized': False,
+            'assignment_synced_id': synced_id,
+        })
+
+    def load_assignments(self):
+        """
+        Arrays of a compact run: dict with norm_ids, customer_ids, labels (0-based)
+        and X (rows follow FEATURE_SELECTION). Returns None when the run has no NPZ.
+        Live-scored results not yet in the NPZ are folded in first.
+        """
+        self.ensure_one()
+        self._check_sklearn()
+        if not self.assignment_file:
+            return None
+        self._sync_live_assignments()
+        with np.load(io.BytesIO(base64.b64decode(self.assignment_file))) as data:
+            return {key: data[key] for key in ('norm_ids', 'customer_ids', 'labels', 'X')}
+
+    def action_materialize_results(self):
+        """Copy the Z-Scores of a compact run from the NPZ onto its kmeans.result rows."""
+        self.ensure_one()
+        # Run mode 'rows' (atau run lama) tidak punya NPZ: Z-Score sudah ada di kmeans.result
+        if self.results_materialized or not self.assignment_file:
+            return True
+        data = self.load_assignments()
+        self.env['kmeans.result'].with_context(from_kmeans_run=True)._bulk_fill_features(
+            self.id, data['customer_ids'], data['X'], [f[0] for f in FEATURE_SELECTION])
+        self.results_materialized = True
+        return True
+
+    def _clear_results(self):
+        """Set-based delete of this run's previous results; returns kmeans.result ready for bulk insert."""
+        _logger.info("Deleting previous cluster results for this run...")
+        ResultModel = self.env['kmeans.result'].with_context(from_kmeans_run=True)
+        ResultModel._delete_for_runs(self.ids)
+        return ResultModel
+
+    def _run_final_kmeans(self):
+        """Full-batch KMeans on the in-memory Z-Score matrix."""
         X, norm_records, feature_names = self._get_normalized_data()
         if len(X) < self.chosen_k: raise UserError(f"Not enough data ({len(X)}) for {self.chosen_k} clusters.")
         # Run K-Means
         kmeans = KMeans(n_clusters=self.chosen_k, init="k-means++", random_state=42, n_init=10)
+        self._report_progress(10)
         labels = kmeans.fit_predict(X)
         centroids = kmeans.cluster_centers_
+        self._report_progress(50)
         # Store results in kmeans.result
-        _logger.info("Deleting previous cluster results for this run...")
-        self.result_ids.unlink()
+        ResultModel = self._clear_results()
         _logger.info(f"Creating {len(labels)} new cluster result records...")
-        ResultModel = self.env['kmeans.result']
-        vals_list = []
-        for i, norm_rec in enumerate(norm_records):
-             vals_list.append({
-                 'run_id': self.id,
-                 'customer_id': norm_rec.customer_id.id,
-                 'cluster_id': int(labels[i]) + 1,
-                 'norm_ticket_count': norm_rec.norm_ticket_count,
-                 'norm_priority': norm_rec.norm_priority,
-                 'norm_complexity': norm_rec.norm_complexity,
-                 'norm_response_time': norm_rec.norm_response_time,
-                 'norm_resolution_time': norm_rec.norm_resolution_time,
-                 'norm_rating': norm_rec.norm_rating,
-                 'norm_point': norm_rec.norm_point,
-             })
-        ResultModel.with_context(from_kmeans_run=True).create(vals_list)
+        chunks = AssignmentBuffer()
+        self._persist_chunk(ResultModel, chunks, [rec.id for rec in norm_records],
+                            [rec.customer_id.id for rec in norm_records], labels, X)
+        self._store_assignments(chunks)
+        self._report_progress(75)
         # Evaluate final clusters
-        final_sil = silhouette_score(X, labels)
+        final_sil = self._score_silhouette(X, labels, centroids)
         final_dbi = davies_bouldin_score(X, labels)
-        _logger.info(f"Final Evaluation: Silhouette={final_sil:.4f}, DBI={final_dbi:.4f}")
-        # Format centroids
-        html_table = "<table class='table table-sm table-bordered'><thead><tr><th>Cluster</th>"
-        html_table += "".join([f"<th>{FEATURE_DICT.get(fn, fn)}</th>" for fn in feature_names]) + "</tr></thead><tbody>" # Use FEATURE_DICT for labels
-        for i, center in enumerate(centroids):
-            html_table += f"<tr><td><b>Cluster {i+1}</b></td>" + "".join([f"<td>{val:.4f}</td>" for val in center]) + "</tr>"
-        html_table += "</tbody></table>"
-        # Save evaluation results
-        self.write({
-            'final_centroids': html_table,
-            'final_silhouette': final_sil,
-            'final_dbi': final_dbi,
-            'run_date': fields.Datetime.now(),
+        used_vals = self._silhouette_used_vals(len(X))
+        used_vals['final_inertia'] = kmeans.inertia_
+        return centroids, final_sil, final_dbi, used_vals
+
+    def _run_final_minibatch(self):
+        """Streaming MiniBatchKMeans: fit with partial_fit, then label + persist + evaluate in one pass."""
+        n_total = self._count_normalized_data(self.chosen_k)
+        model = self._fit_minibatch([self.chosen_k])[0]
+        ResultModel = self._clear_results()
+        chunks = AssignmentBuffer()
+
+        def write_chunk(norm_ids, customer_ids, X_chunk, labels):
+            self._persist_chunk(ResultModel, chunks, norm_ids, customer_ids, labels, X_chunk)
+
+        wcss, silhouettes, dbis, used_vals = self._evaluate_streaming([model], n_total, on_labels=write_chunk)
+        used_vals['final_inertia'] = wcss[0]
+        self._store_assignments(chunks)
+        return model.cluster_centers_, silhouettes[0], dbis[0], used_vals
+
+    # --- Incremental (warm start) ---
+    def _get_centroids(self):
+        """Stored centroids as a (k, n_features) array, or None when the run has none."""
+        data = self.get_centroid_info()
+        if not data.get('centroids') or data.get('feature_names') != [f[0] for f in FEATURE_SELECTION]:
+            return None
+        return np.array(data['centroids'], dtype=float)
+
+    def _get_assignment_map(self):
+        """{normalization id: 0-based cluster} of this run, from the NPZ or from kmeans.result."""
+        self.ensure_one()
+        data = self.load_assignments()
+        if data is not None:
+            # norm id -1: customer hasil live scoring tanpa baris normalization
+            return {norm_id: label for norm_id, label in zip(data['norm_ids'].tolist(), data['labels'].tolist())
+                    if norm_id >= 0}
+        self.env['kmeans.result'].flush_model()
+        self.env.cr.execute("""
+            SELECT normalization_id, cluster_id - 1
+              FROM kmeans_result
+             WHERE run_id = %s AND normalization_id IS NOT NULL
+        """, (self.id,))
+        return dict(self.env.cr.fetchall())
+
+    def _changed_normalization_ids(self, since):
+        """Ids of normalization.name rows written after `since`."""
+        self.env['normalization.name'].flush_model()
+        self.env.cr.execute("SELECT id FROM normalization_name WHERE write_date > %s", (since,))
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    def _fetch_normalized_rows(self, norm_ids):
+        """(normalization ids, customer ids, X) of the given normalization.name rows, one SQL fetch."""
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        self.env['normalization.name'].flush_model()
+        self.env.cr.execute("""
+            SELECT id, customer_id, {columns}
+              FROM normalization_name
+             WHERE id = ANY(%s::int[])
+          ORDER BY id
+        """.format(columns=", ".join("COALESCE(%s, 0)" % fname for fname in feature_names)),
+            ([int(i) for i in norm_ids],))
+        rows = self.env.cr.fetchall()
+        return ([r[0] for r in rows], [r[1] for r in rows],
+                np.array([r[2:] for r in rows], dtype=float).reshape(len(rows), len(feature_names)))
+
+    def _assignment_stats(self, k, norm_ids):
+        """
+        Cluster sums of the stored results of this run (rows with a normalization
+        id): (Z sums (k, d), member counts (k,), {norm id: (label, Z)} for `norm_ids`).
+        """
+        d = len(FEATURE_SELECTION)
+        sums, counts = np.zeros((k, d)), np.zeros(k)
+        wanted = set(norm_ids)
+        data = self.load_assignments()
+        if data is not None:
+            valid = data['norm_ids'] >= 0
+            labels, X = data['labels'][valid].astype(np.int64), data['X'][valid].astype(float)
+            np.add.at(sums, labels, X)
+            counts += np.bincount(labels, minlength=k)[:k]
+            stored = {int(n): (int(label), X[i]) for i, (n, label) in
+                      enumerate(zip(data['norm_ids'][valid].tolist(), labels.tolist())) if n in wanted}
+            return sums, counts, stored
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        columns = ", ".join("COALESCE(%s, 0)" % fname for fname in feature_names)
+        self.env['kmeans.result'].flush_model()
+        self.env.cr.execute("""
+            SELECT cluster_id - 1, COUNT(*), {sums}
+              FROM kmeans_result
+             WHERE run_id = %s AND normalization_id IS NOT NULL
+          GROUP BY cluster_id
+        """.format(sums=", ".join("SUM(COALESCE(%s, 0))" % fname for fname in feature_names)), (self.id,))
+        for row in self.env.cr.fetchall():
+            if 0 <= row[0] < k:
+                counts[row[0]] += row[1]
+                sums[row[0]] += np.array(row[2:], dtype=float)
+        self.env.cr.execute("""
+            SELECT normalization_id, cluster_id - 1, {columns}
+              FROM kmeans_result
+             WHERE run_id = %s AND normalization_id = ANY(%s::int[])
+        """.format(columns=columns), (self.id, [int(i) for i in wanted]))
+        stored = {row[0]: (row[1], np.array(row[2:], dtype=float)) for row in self.env.cr.fetchall()}
+        return sums, counts, stored
+
+    def _run_incremental_kmeans(self):
+        """
+        Incremental update of the centroids of warm_start_run_id from the delta
+        only: the cluster sums of its stored results lose the old Z-Scores of
+        changed/removed customers and gain the new Z-Scores of changed/new ones
+        (each added to its nearest centroid). No refit on the full matrix.
+        One streaming pass then labels every customer against the updated
+        centroids and computes inertia/silhouette/DBI on that same labelling.
+        When the warm start run is this run, only result rows whose data or
+        cluster changed are rewritten.
+        """
+        previous_run = self.warm_start_run_id
+        if not previous_run: raise UserError("Select a run in 'Warm Start From' for incremental clustering.")
+        init = previous_run._get_centroids()
+        if init is None:
+            raise UserError(f"Run {previous_run.id} has no stored centroids. Run its final clustering first.")
+        if len(init) != self.chosen_k:
+            raise UserError(f"Run {previous_run.id} has {len(init)} clusters, but 'Chosen k' is {self.chosen_k}.")
+        previous = previous_run._get_assignment_map()
+        if not previous: raise UserError(f"Run {previous_run.id} has no stored assignments to start from.")
+        n_total = self._count_normalized_data(self.chosen_k)
+
+        # Delta: baris normalization baru/berubah sejak run sebelumnya, dan yang sudah hilang
+        self.env.cr.execute("SELECT id FROM normalization_name")
+        current_ids = {row[0] for row in self.env.cr.fetchall()}
+        since = previous_run.clustering_date or previous_run.run_date
+        changed_ids = (set(self._changed_normalization_ids(since)) & current_ids) | (current_ids - set(previous))
+        removed_ids = set(previous) - current_ids
+        sums, counts, stored = previous_run._assignment_stats(self.chosen_k, (changed_ids | removed_ids) & set(previous))
+        for label, z in stored.values():
+            sums[label] -= z
+            counts[label] -= 1
+
+        def centers():
+            # Cluster yang kosong mempertahankan centroid lamanya
+            return np.where(counts[:, np.newaxis] > 0, sums / np.maximum(counts, 1)[:, np.newaxis], init)
+
+        _ids, _customers, X_changed = self._fetch_normalized_rows(sorted(changed_ids))
+        if len(X_changed):
+            labels_changed = nearest_centroid(X_changed, 0.0, 1.0, centers())
+            np.add.at(sums, labels_changed, X_changed)
+            counts += np.bincount(labels_changed, minlength=self.chosen_k)
+        model = FixedCentroids(centers())
+        self._report_progress(30)
+
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        chunks = AssignmentBuffer()
+        stats = {'moved': 0}
+        changed_list = np.array(sorted(changed_ids), dtype=np.int64)
+        same_storage = bool(self.assignment_file) == (self.storage_mode == 'compact')
+        in_place = previous_run == self and same_storage
+        if in_place:
+            ResultModel = self.env['kmeans.result'].with_context(from_kmeans_run=True)
+            ResultModel._delete_for_normalization(self.id, removed_ids)
+            # Customer live scoring tanpa baris normalization tetap ada di NPZ
+            data = self.load_assignments() if self.storage_mode == 'compact' else None
+            if data is not None and (data['norm_ids'] < 0).any():
+                orphan = data['norm_ids'] < 0
+                chunks.append((data['norm_ids'][orphan], data['customer_ids'][orphan],
+                               data['labels'][orphan], data['X'][orphan]))
+        else:
+            ResultModel = self._clear_results()
+
+        def write_chunk(norm_ids, customer_ids, X_chunk, labels):
+            norm_ids, customer_ids = np.asarray(norm_ids, dtype=np.int64), np.asarray(customer_ids, dtype=np.int64)
+            previous_labels = np.array([previous.get(n, -1) for n in norm_ids.tolist()], dtype=np.int64)
+            stats['moved'] += int(((previous_labels >= 0) & (previous_labels != labels)).sum())
+            if not in_place:
+                self._persist_chunk(ResultModel, chunks, norm_ids, customer_ids, labels, X_chunk)
+                return
+            # Di tempat: hanya baris yang datanya atau cluster-nya berubah yang ditulis ulang
+            dirty = (previous_labels != labels) | np.isin(norm_ids, changed_list)
+            if dirty.any():
+                ResultModel._delete_for_normalization(self.id, norm_ids[dirty].tolist())
+                ResultModel._bulk_insert(self.id, norm_ids[dirty], customer_ids[dirty], labels[dirty],
+                                         None if self.storage_mode == 'compact' else X_chunk[dirty], feature_names)
+            if self.storage_mode == 'compact':
+                chunks.append((norm_ids.astype(np.int32), customer_ids.astype(np.int32),
+                               labels.astype(np.int16), X_chunk.astype(np.float32)))
+
+        wcss, silhouettes, dbis, used_vals = self._evaluate_streaming([model], n_total, on_labels=write_chunk)
+        self._store_assignments(chunks)
+        _logger.info(f"K-Means incremental: {len(changed_ids)} changed/new, {len(removed_ids)} removed, "
+                     f"{stats['moved']} moved of {n_total} customers.")
+        self._report_progress(75)
+        used_vals.update({
+            'final_inertia': wcss[0],
+            'incremental_changed': len(changed_ids),
+            'incremental_moved': stats['moved'],
         })
-        self.invalidate_recordset(['result_count'], self.ids) # Update smart button count
+        return model.cluster_centers_, silhouettes[0], dbis[0], used_vals
+
+    # --- Nearest-Centroid Scoring (customer baru / berubah, tanpa re-cluster) ---
+    def _get_scoring_model(self):
+        """(field names, μ, σ, centroids) arrays of this run, or None when it has no stored scaler."""
+        info = self.get_centroid_info()
+        scaler = info.get('scaler')
+        if not scaler or not info.get('centroids'):
+            return None
+        return (scaler['fields'], np.array(scaler['mean'], dtype=float), np.array(scaler['std'], dtype=float),
+                np.array(info['centroids'], dtype=float))
+
+    def _fetch_avg_features(self, customer_ids, field_names):
+        """(customer ids, raw value matrix) of the customers' current avg.ticket rows, one SQL fetch."""
+        self.env['avg.ticket'].flush_model(['customer_id'] + field_names)
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (customer_id) customer_id, {columns}
+              FROM avg_ticket
+             WHERE customer_id = ANY(%s::int[])
+          ORDER BY customer_id, id DESC
+        """.format(columns=", ".join("COALESCE(%s, 0)" % field for field in field_names)),
+            ([int(c) for c in customer_ids],))
+        rows = self.env.cr.fetchall()
+        return [row[0] for row in rows], np.array([row[1:] for row in rows], dtype=float).reshape(len(rows), len(field_names))
+
+    def score_customers(self, customer_ids):
+        """
+        Nearest-centroid cluster (1-based) of each customer: its current avg.ticket
+        values are z-scored with this run's stored μ/σ and compared to the stored
+        centroids in one broadcast. Customers without avg.ticket are left out.
+        Returns {customer_id: cluster}.
+        """
+        self.ensure_one()
+        self._check_sklearn()
+        model = self._get_scoring_model()
+        if model is None:
+            raise UserError(f"Run {self.id} has no stored centroids/scaler. Run its final clustering again.")
+        field_names, mean, std, centers = model
+        found_ids, X = self._fetch_avg_features(customer_ids, field_names)
+        if not found_ids:
+            return {}
+        labels = nearest_centroid(X, mean, std, centers)
+        return dict(zip(found_ids, (labels + 1).tolist()))
+
+    def score_customer(self, customer_id):
+        """Cluster (1-based) of one customer, or False when it has no avg.ticket row."""
+        return self.score_customers([customer_id]).get(customer_id, False)
+
+    def action_set_live_scoring(self):
+        """Make this run the one used to assign segments between full runs."""
+        self.ensure_one()
+        if self._get_scoring_model() is None:
+            raise UserError("This run has no stored centroids/scaler. Run its final clustering first.")
+        self.search([('live_scoring', '=', True), ('id', '!=', self.id)]).write({'live_scoring': False})
+        self.live_scoring = True
+        return True
+
+    @api.model
+    def _assign_live_segments(self, customer_ids):
+        """
+        Refresh the kmeans.result rows of the live scoring run for the given
+        customers (called from ticket.name after avg.ticket changed). Does nothing
+        without a live run or without numpy/scikit-learn.
+        """
+        if not customer_ids or not SKLEARN_INSTALLED:
+            return
+        run = self.sudo().search([('live_scoring', '=', True)], limit=1)
+        model = run._get_scoring_model() if run else None
+        if model is None:
+            return
+        field_names, mean, std, centers = model
+        found_ids, X = run._fetch_avg_features(customer_ids, field_names)
+        if not found_ids:
+            return
+        labels = nearest_centroid(X, mean, std, centers)
+        feature_names = [f[0] for f in FEATURE_SELECTION]
+        # Run compact: Z-Score di kmeans.result hanya bila hasilnya sudah di-materialize
+        keep_z = run.storage_mode != 'compact' or run.results_materialized
+        # NPZ (snapshot saat clustering) tidak disentuh di sini: baris baru (id > assignment_synced_id)
+        # digabungkan nanti oleh _sync_live_assignments, jadi tidak ada write ke baris run per tiket
+        run.env['kmeans.result'].with_context(from_kmeans_run=True)._replace_customers(
+            run.id, found_ids, labels, (X - mean) / std if keep_z else None, feature_names)
+
+    def _pending_live_rows(self):
+        """[(customer_id, normalization id or -1, 0-based cluster, result id)] written after the NPZ, oldest first."""
+        self.env['kmeans.result'].flush_model()
+        self.env.cr.execute("""
+            SELECT customer_id, COALESCE(normalization_id, -1), cluster_id - 1, id
+              FROM kmeans_result
+             WHERE run_id = %s AND id > %s
+          ORDER BY id
+        """, (self.id, self.assignment_synced_id))
+        return self.env.cr.fetchall()
+
+    def _sync_live_assignments(self):
+        """
+        Fold live-scored kmeans.result rows into the NPZ of a compact run: labels
+        of known customers are replaced, new customers appended, and Z-Scores
+        recomputed from avg.ticket with the run's scaler. Returns True when the
+        NPZ was rewritten. Runs from the cron or before the NPZ is read.
+        """
+        self.ensure_one()
+        if not self.assignment_file:
+            return False
+        rows = self._pending_live_rows()
+        if not rows:
+            return False
+        with np.load(io.BytesIO(base64.b64decode(self.assignment_file))) as npz:
+            data = {key: npz[key] for key in ('norm_ids', 'customer_ids', 'labels', 'X')}
+        # Satu baris per customer (_replace_customers menghapus baris lamanya); yang terbaru menang
+        latest = {row[0]: row for row in rows}
+        customer_ids = np.array(list(latest), dtype=np.int32)
+        labels = np.array([latest[c][2] for c in latest], dtype=np.int16)
+        position = {c: i for i, c in enumerate(data['customer_ids'].tolist())}
+        index = np.array([position.get(c, -1) for c in customer_ids.tolist()], dtype=np.int64)
+        known = index >= 0
+
+        Z = np.zeros((len(customer_ids), data['X'].shape[1]), dtype=np.float32)
+        Z[known] = data['X'][index[known]]
+        model = self._get_scoring_model()
+        if model is not None:
+            field_names, mean, std, _centers = model
+            found_ids, X = self._fetch_avg_features(customer_ids.tolist(), field_names)
+            found = {c: i for i, c in enumerate(found_ids)}
+            rows_found = np.array([found.get(c, -1) for c in customer_ids.tolist()], dtype=np.int64)
+            Z[rows_found >= 0] = ((X - mean) / std)[rows_found[rows_found >= 0]]
+
+        data['labels'][index[known]] = labels[known]
+        data['X'][index[known]] = Z[known]
+        chunks = AssignmentBuffer()
+        chunks.append((data['norm_ids'], data['customer_ids'], data['labels'], data['X']))
+        if not known.all():
+            new_norm_ids = np.array([latest[c][1] for c in customer_ids[~known].tolist()], dtype=np.int32)
+            chunks.append((new_norm_ids, customer_ids[~known], labels[~known], Z[~known]))
+        materialized = self.results_materialized
+        self._store_assignments(chunks, synced_id=rows[-1][3])
+        if materialized:
+            # Baris kmeans.result sudah menyimpan Z-Score saat live scoring
+            self.results_materialized = True
+        _logger.info(f"K-Means: folded {len(latest)} live-scored customer(s) into the NPZ of run {self.id}.")
+        return True
+
+    @api.model
+    def _cron_sync_live_assignments(self):
+        """Cron: bring the NPZ of compact live scoring runs up to date with their kmeans.result rows."""
+        if not SKLEARN_INSTALLED:
+            return True
+        for run in self.search([('live_scoring', '=', True), ('storage_mode', '=', 'compact')]):
+            run._sync_live_assignments()
         return True
 
     def action_view_results(self):
@@ -217,6 +1080,112 @@ class IntelligentKmeans(models.Model):
             'context': {'search_default_group_by_cluster': 1}
         }
 
+    # --- Scatter Plot Data (RPC dari kmeans_scatter_plot.js) ---
+    def get_scatter_data(self, x_feature, y_feature, max_points=SCATTER_MAX_POINTS, mode='sample',
+                         viewport=None, packed=False, grid_size=SCATTER_GRID_SIZE):
+        """
+        Two features of this run's assignments, reduced for plotting.
+
+        - viewport [xmin, xmax, ymin, ymax]: only points inside it; when no more
+          than max_points remain they are all returned (mode 'full').
+        - mode 'sample': stratified random sample per cluster (fixed seed),
+          quota proportional to cluster size.
+        - mode 'grid': grid_size x grid_size bins per cluster, one point per
+          non-empty bin at the members' mean with a density 'count'.
+        - packed: x/y/cluster(/count) as one base64 Float32Array (column after
+          column) instead of JSON lists.
+        """
+        self.ensure_one()
+        self._check_sklearn()
+        if x_feature not in FEATURE_DICT or y_feature not in FEATURE_DICT:
+            raise UserError("Unknown scatter plot feature.")
+        customer_ids, labels, X = self._scatter_arrays(x_feature, y_feature)
+        result = {'clusters': sorted(int(c) for c in np.unique(labels))}
+        if not len(labels):
+            result.update({'mode': 'full', 'total': 0, 'returned': 0, 'bounds': None})
+            return self._scatter_payload(result, {'x': X[:, 0], 'y': X[:, 1], 'cluster': labels}, packed)
+        result['bounds'] = [float(X[:, 0].min()), float(X[:, 0].max()), float(X[:, 1].min()), float(X[:, 1].max())]
+
+        if viewport:
+            xmin, xmax, ymin, ymax = viewport
+            inside = (X[:, 0] >= xmin) & (X[:, 0] <= xmax) & (X[:, 1] >= ymin) & (X[:, 1] <= ymax)
+            customer_ids, labels, X = customer_ids[inside], labels[inside], X[inside]
+        result['total'] = int(len(labels))
+
+        if len(labels) <= max_points:
+            result['mode'] = 'full'
+        elif mode == 'grid':
+            result['mode'] = 'grid'
+            columns = self._scatter_grid(labels, X, grid_size)
+            result['returned'] = int(len(columns['x']))
+            return self._scatter_payload(result, columns, packed)
+        else:
+            result['mode'] = 'sample'
+            keep = self._scatter_sample(labels, max_points)
+            customer_ids, labels, X = customer_ids[keep], labels[keep], X[keep]
+
+        result['returned'] = int(len(labels))
+        names = dict(self.env['res.partner'].browse([int(c) for c in set(customer_ids.tolist())]).name_get())
+        result['customers'] = [names.get(int(c), 'Unknown Customer') for c in customer_ids]
+        return self._scatter_payload(result, {'x': X[:, 0], 'y': X[:, 1], 'cluster': labels}, packed)
+
+    def _scatter_arrays(self, x_feature, y_feature):
+        """(customer_ids, labels 1-based, X[:, [x, y]]) from the NPZ of a compact run or from kmeans_result."""
+        data = self.load_assignments() if not self.results_materialized else None
+        if data is not None:
+            feature_names = [f[0] for f in FEATURE_SELECTION]
+            columns = [feature_names.index(x_feature), feature_names.index(y_feature)]
+            return data['customer_ids'], data['labels'].astype(np.int32) + 1, data['X'][:, columns].astype(float)
+        self.env['kmeans.result'].flush_model()
+        # Hanya dua kolom fitur yang dibaca (nama kolom sudah divalidasi terhadap FEATURE_DICT)
+        self.env.cr.execute("""
+            SELECT customer_id, cluster_id, COALESCE({x}, 0), COALESCE({y}, 0)
+              FROM kmeans_result
+             WHERE run_id = %s
+          ORDER BY id
+        """.format(x=x_feature, y=y_feature), (self.id,))
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.int32), np.zeros((0, 2))
+        arr = np.array(rows, dtype=float)
+        return arr[:, 0].astype(np.int32), arr[:, 1].astype(np.int32), arr[:, 2:4]
+
+    def _scatter_sample(self, labels, max_points):
+        """Indices of a stratified sample: per-cluster quota proportional to its size (at least 1)."""
+        rng = np.random.default_rng(42)
+        keep = []
+        clusters, counts = np.unique(labels, return_counts=True)
+        for cluster, count in zip(clusters, counts):
+            members = np.flatnonzero(labels == cluster)
+            quota = max(1, int(round(max_points * count / len(labels))))
+            keep.append(members if quota >= count else rng.choice(members, quota, replace=False))
+        return np.sort(np.concatenate(keep))
+
+    def _scatter_grid(self, labels, X, grid_size):
+        """Per-cluster grid binning: mean position + member count of every non-empty bin."""
+        mins, maxs = X.min(axis=0), X.max(axis=0)
+        span = np.where(maxs > mins, maxs - mins, 1.0)
+        cells = np.minimum(((X - mins) / span * grid_size).astype(np.int64), grid_size - 1)
+        keys = (labels.astype(np.int64) * grid_size + cells[:, 0]) * grid_size + cells[:, 1]
+        unique_keys, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        return {
+            'x': np.bincount(inverse, weights=X[:, 0]) / counts,
+            'y': np.bincount(inverse, weights=X[:, 1]) / counts,
+            'cluster': unique_keys // (grid_size * grid_size),
+            'count': counts,
+        }
+
+    def _scatter_payload(self, result, columns, packed):
+        """Attach the point columns as JSON lists or as one packed base64 Float32Array."""
+        if packed:
+            result['columns'] = list(columns)
+            result['packed'] = base64.b64encode(
+                np.concatenate([np.asarray(col, dtype=np.float32) for col in columns.values()]).tobytes()
+            ).decode()
+        else:
+            result.update({name: np.asarray(col).tolist() for name, col in columns.items()})
+        return result
+
     # --- Action to launch the Scatter Plot Client Action ---
     def action_view_scatter_plot(self):
         self.ensure_one()
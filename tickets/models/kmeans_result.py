@@ -60,4 +60,95 @@ class KmeansResult(models.Model):
     # Unlink is allowed (e.g., when re-running clustering)
     def unlink(self):
         _logger.info(f"Deleting kmeans.result records: {self.ids}")
-        return super(KmeansResult, self).unlink()
\ No newline at end of file
+        return super(KmeansResult, self).unlink()
+
+    # ========= Bulk Persistence (dipakai oleh intelligent.kmeans) =========
+    INSERT_CHUNK_SIZE = 10000
+
+    @api.model
+    def _delete_for_runs(self, run_ids):
+        """Drop every result of the given runs with one DELETE (no per-record ORM unlink)."""
+        self.flush_model()
+        self.env.cr.execute("DELETE FROM kmeans_result WHERE run_id IN %s", (tuple(run_ids),))
+        deleted = self.env.cr.rowcount
+        self.invalidate_model()
+        _logger.info(f"Deleted {deleted} kmeans.result records of run(s) {list(run_ids)}.")
+        return deleted
+
+    @api.model
+    def _delete_for_normalization(self, run_id, norm_ids):
+        """Drop the results of one run for the given normalization rows only (live-scored rows without one stay)."""
+        self.flush_model()
+        self.env.cr.execute("""
+            DELETE FROM kmeans_result
+             WHERE run_id = %s AND normalization_id = ANY(%s::int[])
+        """, (run_id, [int(i) for i in norm_ids]))
+        deleted = self.env.cr.rowcount
+        self.invalidate_model()
+        return deleted
+
+    @api.model
+    def _replace_customers(self, run_id, customer_ids, labels, X, feature_names):
+        """
+        Replace the results of some customers in one run (live nearest-centroid
+        scoring). normalization_id points to the customer's current normalization row, if any.
+        """
+        self.flush_model()
+        customer_ids = [int(c) for c in customer_ids]
+        self.env.cr.execute("DELETE FROM kmeans_result WHERE run_id = %s AND customer_id = ANY(%s::int[])",
+                            (run_id, customer_ids))
+        self.env['normalization.name'].flush_model(['customer_id'])
+        self.env.cr.execute("SELECT customer_id, id FROM normalization_name WHERE customer_id = ANY(%s::int[])",
+                            (customer_ids,))
+        norm_by_customer = dict(self.env.cr.fetchall())
+        norm_ids = [norm_by_customer.get(c) for c in customer_ids]
+        return self._bulk_insert(run_id, norm_ids, customer_ids, labels, X, feature_names)
+
+    @api.model
+    def _bulk_insert(self, run_id, norm_ids, customer_ids, labels, X, feature_names):
+        """
+        Insert cluster assignments in INSERT_CHUNK_SIZE chunks straight from arrays.
+        labels are 0-based (stored 1-based); X columns follow feature_names.
+        X=None inserts lookup rows only (compact runs keep the Z-Scores in an NPZ).
+        """
+        if not self.env.context.get('from_kmeans_run'):
+            raise models.UserError("Cluster results cannot be created manually. Use the K-Means control panel.")
+        feature_names = feature_names if X is not None else []
+        columns = "".join(", %s" % fname for fname in feature_names)
+        unnest_args = ", ".join(["%s::int[]", "%s::int[]", "%s::int[]"] + ["%s::float8[]"] * len(feature_names))
+        query = """
+            INSERT INTO kmeans_result (run_id, normalization_id, customer_id, cluster_id{columns},
+                                       create_uid, create_date, write_uid, write_date)
+            SELECT %s, v.*, %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+              FROM unnest({unnest_args}) AS v
+        """.format(columns=columns, unnest_args=unnest_args)
+        uid = self.env.uid
+        total = len(labels)
+        for start in range(0, total, self.INSERT_CHUNK_SIZE):
+            stop = start + self.INSERT_CHUNK_SIZE
+            params = [run_id, uid, uid,
+                      [int(i) if i else None for i in norm_ids[start:stop]],
+                      [int(i) for i in customer_ids[start:stop]],
+                      [int(label) + 1 for label in labels[start:stop]]]
+            params += [X[start:stop, i].astype(float).tolist() for i in range(len(feature_names))]
+            self.env.cr.execute(query, params)
+        self.invalidate_model()
+        return total
+
+    @api.model
+    def _bulk_fill_features(self, run_id, customer_ids, X, feature_names):
+        """Set the Z-Score columns of existing results of a run (chunked UPDATE ... FROM unnest)."""
+        assignments = ", ".join("%s = v.%s" % (fname, fname) for fname in feature_names)
+        unnest_args = ", ".join(["%s::int[]"] + ["%s::float8[]"] * len(feature_names))
+        query = """
+            UPDATE kmeans_result r
+               SET {assignments}
+              FROM unnest({unnest_args}) AS v(customer_id, {columns})
+             WHERE r.run_id = %s AND r.customer_id = v.customer_id
+        """.format(assignments=assignments, unnest_args=unnest_args, columns=", ".join(feature_names))
+        for start in range(0, len(customer_ids), self.INSERT_CHUNK_SIZE):
+            stop = start + self.INSERT_CHUNK_SIZE
+            params = [[int(i) for i in customer_ids[start:stop]]]
+            params += [X[start:stop, i].astype(float).tolist() for i in range(len(feature_names))]
+            self.env.cr.execute(query, params + [run_id])
+        self.invalidate_model()
\ No newline at end of file
@@ -5,6 +5,14 @@ import math  # <-- Import math instead of numpy
 
 _logger = logging.getLogger(__name__)
 
+# numpy is optional here: used for the vectorized path, pure-python fallback otherwise
+try:
+    import numpy as np
+    NUMPY_INSTALLED = True
+except ImportError:
+    _logger.warning("⚠️ Normalization: numpy not installed, using pure-python statistics.")
+    NUMPY_INSTALLED = False
+
 
 class NormalizationName(models.Model):
     _name = "normalization.name"
@@ -58,6 +66,14 @@ class NormalizationName(models.Model):
         'avg_point': 'norm_point',
     }
 
+    # ir.config_parameter holding the analytics.snapshot version last normalized
+    VERSION_PARAM = 'tickets.normalization_data_version'
+    # Refit scaler (μ/σ) bila drift melewati batas ini atau umur scaler melewati N hari
+    DRIFT_THRESHOLD_PARAM = 'tickets.normalization_drift_threshold'
+    DRIFT_THRESHOLD_DEFAULT = 0.1
+    SCALER_MAX_AGE_PARAM = 'tickets.normalization_scaler_max_age_days'
+    SCALER_MAX_AGE_DEFAULT = 30
+
     # ========= Helpers =========
     @api.depends('customer_id')
     def _compute_customer_name(self):
@@ -107,16 +123,42 @@ class NormalizationName(models.Model):
 
     # ========= Compute Normalization for All =========
     @api.model
-    def recompute_all(self):
+    def action_queue_recompute_all(self):
+        """Queue a forced recompute_all as a background job."""
+        self.env['analytics.job'].enqueue(self.browse(), 'action_recompute_all_forced', "Normalization: Recompute All")
+        return True
+
+    @api.model
+    def action_recompute_all_forced(self):
+        return self.recompute_all(force=True)
+
+    @api.model
+    def recompute_all(self, force=False, reason='manual'):
         """
         Recompute normalization for all customers using data from avg.ticket.
-        This is fully automatic, just like avg.ticket.recompute_all().
+        avg.ticket is kept up to date incrementally, and the per-customer
+        matrix is read from the shared analytics snapshot; when the ticket
+        data version did not change since the last run, nothing is rewritten.
+        Every full recompute freezes its μ/σ as a new normalization.scaler version.
         """
         _logger.info("Starting normalization recompute_all...")
-        
-        # 0. Refresh avg.ticket data first to ensure it's up-to-date
-        _logger.info("Refreshing avg.ticket records first...")
-        self.env['avg.ticket'].recompute_all()
+
+        # 0. Shared snapshot (rebuilt only if ticket data changed)
+        snapshot = self.env['analytics.snapshot'].get_snapshot()
+        params = self.env['ir.config_parameter'].sudo()
+        if not force and params.get_param(self.VERSION_PARAM) == snapshot.data_version:
+            _logger.info(f"Ticket data unchanged (version {snapshot.data_version}), normalization skipped.")
+            return {'created': 0, 'updated': 0, 'deleted': 0, 'skipped': True}
+
+        result = self._recompute_all_from(snapshot, reason)
+        if result:
+            params.set_param(self.VERSION_PARAM, snapshot.data_version)
+        return result
+
+    @api.model
+    def _recompute_all_from(self, snapshot, reason='manual'):
+        if NUMPY_INSTALLED:
+            return self._recompute_all_numpy(snapshot, reason)
 
         # 1. Get all average records
         AvgTicket = self.env['avg.ticket']
@@ -135,6 +177,11 @@ class NormalizationName(models.Model):
             return False
             
         _logger.info("Global statistics computed (μ and σ).")
+        self.env['normalization.scaler']._create_version(
+            self.FIELDS_TO_NORMALIZE,
+            [global_stats[field]['mean'] for field in self.FIELDS_TO_NORMALIZE],
+            [global_stats[field]['std_dev'] for field in self.FIELDS_TO_NORMALIZE],
+            len(avg_records), reason)
 
         # 3. Update or create normalization records
         created, updated = 0, 0
@@ -186,20 +233,208 @@ class NormalizationName(models.Model):
         _logger.info(f"✅ Normalization finished — Created: {created}, Updated: {updated}, Deleted: {deleted}")
         return {'created': created, 'updated': updated, 'deleted': deleted}
 
+    # ========= Vectorized (numpy) path =========
+    UPSERT_CHUNK_SIZE = 10000
+
+    @api.model
+    def _recompute_all_numpy(self, snapshot, reason='manual'):
+        """Compute μ/σ and every Z-Score in one vectorized step, then bulk upsert."""
+        customer_ids, rows = snapshot.get_feature_matrix()
+        if not customer_ids:
+            _logger.warning("⚠️ No data found in avg.ticket for normalization. Aborting.")
+            return False
+
+        # Snapshot columns -> FIELDS_TO_NORMALIZE order
+        columns = [snapshot.FEATURE_FIELDS.index(field) for field in self.FIELDS_TO_NORMALIZE]
+        X = np.array(rows, dtype=float)[:, columns]
+
+        _logger.info(f"Found {len(customer_ids)} records from avg.ticket to normalize (numpy).")
+
+        # z = (x - μ) / σ, population σ like _get_global_stats
+        mu = X.mean(axis=0)
+        sigma = X.std(axis=0)
+        sigma[sigma == 0] = 1.0  # Prevent division by zero
+        Z = (X - mu) / sigma
+        self.env['normalization.scaler']._create_version(
+            self.FIELDS_TO_NORMALIZE, mu.tolist(), sigma.tolist(), len(customer_ids), reason)
+
+        created, updated = self._bulk_upsert(customer_ids, X, Z)
+        deleted = self._delete_stale()
+
+        _logger.info(f"✅ Normalization finished — Created: {created}, Updated: {updated}, Deleted: {deleted}")
+        return {'created': created, 'updated': updated, 'deleted': deleted}
+
+    @api.model
+    def _bulk_upsert(self, customer_ids, X, Z):
+        """
+        Write original values + Z-Scores keyed on customer_id, in chunks of UPSERT_CHUNK_SIZE.
+        Rows whose values did not change are left alone, so write_date marks the
+        customers that really changed (used by incremental K-Means).
+        """
+        self.flush_model()
+        norm_fields = [self.NORM_FIELD_MAP[field] for field in self.FIELDS_TO_NORMALIZE]
+        value_columns = self.FIELDS_TO_NORMALIZE + norm_fields
+
+        columns = {col: "data.%s" % col for col in value_columns}
+        columns.update({'last_normalized': '%(now)s', 'write_uid': '%(uid)s', 'write_date': '%(now)s'})
+        insert_columns = dict(columns, customer_id='data.customer_id', create_uid='%(uid)s', create_date='%(now)s')
+
+        query = """
+            WITH data AS (
+                SELECT * FROM unnest(%(customer_id)s::int[], {unnest_args})
+                    AS d(customer_id, {value_columns})
+            ), upd AS (
+                UPDATE normalization_name n
+                   SET {update_set}
+                  FROM data
+                 WHERE n.customer_id = data.customer_id
+                   AND ({changed})
+             RETURNING n.customer_id
+            ), ins AS (
+                INSERT INTO normalization_name ({insert_columns})
+                SELECT {insert_values}
+                  FROM data
+                 WHERE NOT EXISTS (SELECT 1 FROM normalization_name n WHERE n.customer_id = data.customer_id)
+             RETURNING id
+            )
+            SELECT (SELECT COUNT(DISTINCT customer_id) FROM upd), (SELECT COUNT(*) FROM ins)
+        """.format(
+            unnest_args=", ".join("%%(%s)s::float8[]" % col for col in value_columns),
+            value_columns=", ".join(value_columns),
+            update_set=", ".join("%s = %s" % (col, expr) for col, expr in columns.items()),
+            changed=" OR ".join("n.%s IS DISTINCT FROM data.%s" % (col, col) for col in value_columns),
+            insert_columns=", ".join(insert_columns),
+            insert_values=", ".join(insert_columns.values()),
+        )
+
+        matrix = np.hstack([X, Z])
+        now = fields.Datetime.now()
+        created = updated = 0
+        for start in range(0, len(customer_ids), self.UPSERT_CHUNK_SIZE):
+            stop = start + self.UPSERT_CHUNK_SIZE
+            chunk = matrix[start:stop]
+            params = {col: chunk[:, j].tolist() for j, col in enumerate(value_columns)}
+            params.update({'customer_id': customer_ids[start:stop], 'now': now, 'uid': self.env.uid})
+            self.env.cr.execute(query, params)
+            chunk_updated, chunk_created = self.env.cr.fetchone()
+            updated += chunk_updated
+            created += chunk_created
+            self.env['analytics.job']._report_progress(100.0 * min(stop, len(customer_ids)) / len(customer_ids))
+
+        self.invalidate_model()
+        return created, updated
+
+    @api.model
+    def _delete_stale(self):
+        """Remove normalization rows of customers that no longer have an avg.ticket record."""
+        self.env.cr.execute("""
+            DELETE FROM normalization_name n
+             WHERE NOT EXISTS (SELECT 1 FROM avg_ticket a WHERE a.customer_id = n.customer_id)
+        """)
+        deleted = self.env.cr.rowcount
+        if deleted:
+            self.invalidate_model()
+            _logger.info(f"Cleaned up {deleted} stale normalization records.")
+        return deleted
+
+    # ========= Refresh against the frozen scaler =========
+    @api.model
+    def _refresh_customers(self, customer_ids, scaler):
+        """
+        Re-read the avg.ticket values of some customers and z-score them with
+        the frozen μ/σ of `scaler`. Other customers are untouched, so the cost
+        is O(len(customer_ids)) instead of a full recompute.
+        """
+        if not customer_ids:
+            return 0
+        params = scaler.get_params()
+        self.env['avg.ticket'].flush_model(['customer_id'] + self.FIELDS_TO_NORMALIZE)
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (customer_id) customer_id, {columns}
+              FROM avg_ticket
+             WHERE customer_id = ANY(%s::int[])
+          ORDER BY customer_id, id DESC
+        """.format(columns=", ".join("COALESCE(%s, 0)" % field for field in params['fields'])),
+            ([int(c) for c in customer_ids],))
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return 0
+        found_ids = [row[0] for row in rows]
+        if NUMPY_INSTALLED:
+            X = np.array([row[1:] for row in rows], dtype=float)
+            Z = (X - np.array(params['mean'])) / np.array(params['std'])
+            self._bulk_upsert(found_ids, X, Z)
+        else:
+            existing = {rec.customer_id.id: rec for rec in self.search([('customer_id', 'in', found_ids)])}
+            for row in rows:
+                vals = dict(zip(params['fields'], row[1:]))
+                vals.update({self.NORM_FIELD_MAP[field]: z for field, z in zip(params['fields'], scaler.transform_values(row[1:]))})
+                vals['last_normalized'] = fields.Datetime.now()
+                if row[0] in existing:
+                    existing[row[0]].write(vals)
+                else:
+                    self.with_context(from_ticket_auto=True).create(dict(vals, customer_id=row[0]))
+        # Tandai sudah dinormalisasi tanpa menyentuh write_date (baris yang nilainya tidak berubah)
+        self.flush_model()
+        self.env.cr.execute("UPDATE normalization_name SET last_normalized = %s WHERE customer_id = ANY(%s::int[])",
+                            (fields.Datetime.now(), found_ids))
+        self.invalidate_model(['last_normalized'])
+        return len(found_ids)
+
+    @api.model
+    def _stale_customer_ids(self):
+        """Customers whose avg.ticket changed after their last normalization (or that have none yet)."""
+        self.env['avg.ticket'].flush_model(['customer_id'])
+        self.flush_model(['customer_id', 'last_normalized'])
+        self.env.cr.execute("""
+            SELECT DISTINCT a.customer_id
+              FROM avg_ticket a
+         LEFT JOIN normalization_name n ON n.customer_id = a.customer_id
+             WHERE a.customer_id IS NOT NULL
+               AND (n.id IS NULL OR n.last_normalized IS NULL OR a.write_date > n.last_normalized)
+        """)
+        return [row[0] for row in self.env.cr.fetchall()]
+
+    @api.model
+    def _cron_refresh(self):
+        """
+        Daily refresh. Refit μ/σ (full recompute) when the population drifted
+        past the threshold or the scaler is too old; otherwise only z-score
+        the customers whose averages changed, against the frozen scaler.
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        threshold = float(params.get_param(self.DRIFT_THRESHOLD_PARAM, self.DRIFT_THRESHOLD_DEFAULT))
+        max_age = int(params.get_param(self.SCALER_MAX_AGE_PARAM, self.SCALER_MAX_AGE_DEFAULT))
+        scaler = self.env['normalization.scaler'].get_current()
+        if not scaler:
+            return self.recompute_all(force=True, reason='schedule')
+        drift = scaler.measure_drift()
+        if drift > threshold:
+            _logger.info(f"Normalization drift {drift:.4f} > {threshold}: refitting scaler.")
+            return self.recompute_all(force=True, reason='drift')
+        if scaler.fitted_at and (fields.Datetime.now() - scaler.fitted_at).days >= max_age:
+            _logger.info(f"Normalization scaler v{scaler.version} older than {max_age} days: refitting.")
+            return self.recompute_all(force=True, reason='schedule')
+        refreshed = self._refresh_customers(self._stale_customer_ids(), scaler)
+        deleted = self._delete_stale()
+        _logger.info(f"Normalization refreshed against scaler v{scaler.version} "
+                     f"(drift {drift:.4f}): {refreshed} customers, {deleted} deleted.")
+        return {'refreshed': refreshed, 'deleted': deleted, 'drift': drift}
+
     # ========= Manual refresh single =========
     def action_refresh(self):
         """
-        Refresh one or more selected records.
-        NOTE: This must re-calculate ALL normalization records.
-        Why? Because refreshing one customer's average (x) changes the
-        global mean (μ) and std dev (σ), which means every other
-        customer's Z-Score (z) is also affected.
+        Refresh the selected records against the current frozen scaler.
+        μ/σ stay as they are (so other customers' Z-Scores stay valid);
+        a full recompute only happens when no scaler was fitted yet.
         """
-        _logger.info(f"Manual refresh triggered for {len(self)} records. Running recompute_all...")
-        # The logic is statistically correct: refreshing one 
-        # requires refreshing all, so we just call the main function.
-        self.recompute_all()
-        _logger.info("Manual refresh complete.")
+        scaler = self.env['normalization.scaler'].get_current()
+        if not scaler:
+            _logger.info("No normalization scaler yet. Running recompute_all...")
+            self.recompute_all(force=True)
+            return True
+        refreshed = self._refresh_customers(self.mapped('customer_id').ids, scaler)
+        _logger.info(f"Manual refresh of {refreshed} customers against scaler v{scaler.version} complete.")
         return True
 
     @api.model
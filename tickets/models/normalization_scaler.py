@@ -0,0 +1,117 @@
+# tickets/models/normalization_scaler.py
+from odoo import api, fields, models
+import json
+import logging
+
+_logger = logging.getLogger(__name__)
+
+SCALER_REASONS = [
+    ('manual', 'Recompute All'),
+    ('drift', 'Drift Threshold'),
+    ('schedule', 'Scheduled Refit'),
+]
+
+
+class NormalizationScaler(models.Model):
+    _name = 'normalization.scaler'
+    _description = 'Frozen Normalization Parameters (μ/σ per Version)'
+    _order = 'version desc'
+    _rec_name = 'name'
+
+    name = fields.Char(string='Scaler', compute='_compute_name')
+    version = fields.Integer(string='Version', required=True, readonly=True, index=True)
+    is_current = fields.Boolean(string='Current', readonly=True, index=True)
+    fitted_at = fields.Datetime(string='Fitted At', readonly=True)
+    reason = fields.Selection(SCALER_REASONS, string='Reason', readonly=True)
+    customer_count = fields.Integer(string='Customers', readonly=True)
+    # {"fields": [...], "mean": [...], "std": [...]} (urutan normalization.FIELDS_TO_NORMALIZE)
+    params = fields.Text(string='Parameters (JSON)', readonly=True)
+    params_display = fields.Html(string='μ / σ', compute='_compute_params_display')
+    last_drift = fields.Float(string='Last Measured Drift', readonly=True, digits=(16, 4),
+        help="Largest |Δμ|/σ or |σ'/σ - 1| over all features at the last drift check.")
+    last_drift_check = fields.Datetime(string='Last Drift Check', readonly=True)
+
+    @api.depends('version')
+    def _compute_name(self):
+        for scaler in self:
+            scaler.name = f"Scaler v{scaler.version}"
+
+    @api.depends('params')
+    def _compute_params_display(self):
+        for scaler in self:
+            params = scaler.get_params()
+            if not params:
+                scaler.params_display = False
+                continue
+            rows = "".join(f"<tr><td>{field}</td><td>{mu:.4f}</td><td>{sigma:.4f}</td></tr>"
+                           for field, mu, sigma in zip(params['fields'], params['mean'], params['std']))
+            scaler.params_display = ("<table class='table table-sm table-bordered'><thead><tr>"
+                                     "<th>Field</th><th>μ</th><th>σ</th></tr></thead><tbody>%s</tbody></table>" % rows)
+
+    # ========= Versions =========
+    @api.model
+    def get_current(self):
+        """The scaler normalization.name Z-Scores are currently based on (empty if never fitted)."""
+        return self.search([('is_current', '=', True)], limit=1)
+
+    @api.model
+    def _create_version(self, field_names, mean, std, customer_count, reason='manual'):
+        """Freeze new μ/σ (σ=0 -> 1) as the next version and make it current."""
+        self.search([('is_current', '=', True)]).write({'is_current': False})
+        last = self.search([], limit=1)
+        scaler = self.create({
+            'version': (last.version or 0) + 1,
+            'is_current': True,
+            'fitted_at': fields.Datetime.now(),
+            'reason': reason,
+            'customer_count': customer_count,
+            'params': json.dumps({
+                'fields': list(field_names),
+                'mean': [float(mu) for mu in mean],
+                'std': [float(sigma) if sigma else 1.0 for sigma in std],
+            }),
+        })
+        _logger.info(f"Normalization scaler v{scaler.version} fitted on {customer_count} customers ({reason}).")
+        return scaler
+
+    def get_params(self):
+        """{'fields', 'mean', 'std'} of this version ({} if empty)."""
+        self.ensure_one()
+        return json.loads(self.params or '{}')
+
+    def transform_values(self, values):
+        """Z-Scores of one customer: `values` follows the scaler fields. O(features), no numpy needed."""
+        params = self.get_params()
+        return [(x - mu) / sigma for x, mu, sigma in zip(values, params['mean'], params['std'])]
+
+    # ========= Drift =========
+    @api.model
+    def _population_stats(self, field_names):
+        """(customer count, μ list, σ list) of the current avg.ticket rows (one per customer), one SQL aggregate."""
+        self.env['avg.ticket'].flush_model(['customer_id'] + list(field_names))
+        self.env.cr.execute("""
+            SELECT COUNT(*), {aggregates}
+              FROM (SELECT DISTINCT ON (customer_id) {columns}
+                      FROM avg_ticket
+                     WHERE customer_id IS NOT NULL
+                  ORDER BY customer_id, id DESC) a
+        """.format(
+            columns=", ".join("COALESCE(%s, 0) AS %s" % (field, field) for field in field_names),
+            aggregates=", ".join("AVG(%s), STDDEV_POP(%s)" % (field, field) for field in field_names),
+        ))
+        row = self.env.cr.fetchone()
+        return row[0], [float(v or 0.0) for v in row[1::2]], [float(v or 0.0) for v in row[2::2]]
+
+    def measure_drift(self):
+        """
+        How far today's avg.ticket population moved from this frozen version:
+        max over features of |μ' - μ| / σ and |σ' / σ - 1|. Stored on the record.
+        """
+        self.ensure_one()
+        params = self.get_params()
+        _count, mean_now, std_now = self._population_stats(params['fields'])
+        drift = 0.0
+        for mu, sigma, mu_now, sigma_now in zip(params['mean'], params['std'], mean_now, std_now):
+            drift = max(drift, abs(mu_now - mu) / sigma, abs((sigma_now or 1.0) / sigma - 1.0))
+        self.write({'last_drift': drift, 'last_drift_check': fields.Datetime.now()})
+        return drift
@@ -1,4 +1,4 @@
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 from odoo.exceptions import ValidationError
 from odoo.exceptions import ValidationError
 from odoo.tools import DEFAULT_SERVER_DATE_FORMAT as DATE_FORMAT
@@ -17,26 +17,143 @@ class Point(models.Model):
 
     expired_date = fields.Datetime('Expired date')
 
+    # Tidak disimpan: dihitung saat dibaca dari SUM point_transaction (index customer/produk),
+    # jadi potong poin tidak mengunci baris point.name lain milik customer/produk yang sama
     total_min_points = fields.Float(
         string="Total Used Tiket Poin",
         compute="_compute_total_min_points",
-        store=True
     )
 
+    def init(self):
+        # Partial index untuk _resolve_best_balances (hanya saldo yang masih ada)
+        tools.create_index(self._cr, 'point_name_best_balance_index',
+                           self._table, ['customer_id', 'product_point', 'expired_date'],
+                           where='name > 0')
+
+    @api.model
+    def _resolve_best_balances(self, pairs):
+        """
+        Best usable balance for every (customer_id, product_id) pair in one
+        query: points left (name > 0), not expired, expiring first (balances
+        without expiry last). Returns {(customer_id, product_id): point.name};
+        pairs without a usable balance are missing from the result.
+        """
+        pairs = {pair for pair in pairs if pair[0] and pair[1]}
+        if not pairs:
+            return {}
+        self.flush_model(['customer_id', 'product_point', 'name', 'expired_date'])
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (customer_id, product_point) customer_id, product_point, id
+              FROM point_name
+             WHERE (customer_id, product_point) IN %s
+               AND name > 0
+               AND (expired_date IS NULL OR expired_date > %s)
+          ORDER BY customer_id, product_point, expired_date ASC NULLS LAST, id
+        """, (tuple(pairs), fields.Datetime.now()))
+        return {(customer_id, product_id): self.browse(point_id)
+                for customer_id, product_id, point_id in self.env.cr.fetchall()}
+
     @api.depends('customer_id','product_point')  # depend on customer
     def _compute_total_min_points(self):
+        """
+        Computed on read: one SQL SUM per (customer, product) over
+        point_transaction for the whole recordset (indexed on both columns).
+        """
+        pairs = {(rec.customer_id.id, rec.product_point.id) for rec in self
+                 if rec.customer_id and rec.product_point}
+        totals = {}
+        if pairs:
+            self.env['point.transaction'].flush_model(['customer_id', 'problem_ticket', 'used_point'])
+            self.env.cr.execute("""
+                SELECT customer_id, problem_ticket, SUM(used_point)
+                  FROM point_transaction
+                 WHERE (customer_id, problem_ticket) IN %s
+              GROUP BY customer_id, problem_ticket
+            """, (tuple(pairs),))
+            totals = {(c, p): total for c, p, total in self.env.cr.fetchall()}
         for record in self:
-            if record.customer_id and record.product_point:
-                # Ambil semua tiket milik customer ini
-                tickets = self.env['point.transaction'].search([
-                    ('customer_id', '=', record.customer_id.id),
-                    ('problem_ticket', '=', record.product_point.id)
-                ])
-                # Akumulasi semua min_point
-                total = sum(t.used_point for t in tickets)
-                record.total_min_points = total
-            else:
-                record.total_min_points = 0
+            record.total_min_points = totals.get((record.customer_id.id, record.product_point.id), 0)
+
+    @api.model
+    def _ledger_deduct_many(self, amounts):
+        """
+        Deduct {point_id: amount} from several balances in one conditional
+        UPDATE (no point.transaction). Returns False when any balance does
+        not cover its amount; the caller must then raise so the transaction
+        (and the deductions that did apply) is rolled back.
+        """
+        amounts = {point_id: amount for point_id, amount in amounts.items() if amount}
+        if not amounts:
+            return True
+        self.flush_model(['name'])
+        ids = list(amounts)
+        self.env.cr.execute("""
+            WITH v AS (
+                SELECT * FROM unnest(%s::int[], %s::float8[]) AS v(id, amount)
+            )
+            UPDATE point_name p
+               SET name = p.name - v.amount,
+                   write_uid = %s, write_date = (now() at time zone 'UTC')
+              FROM v
+             WHERE p.id = v.id
+               AND p.name >= v.amount
+        """, (ids, [amounts[i] for i in ids], self.env.uid))
+        updated = self.env.cr.rowcount
+        self.browse(ids).invalidate_recordset(['name', 'write_uid', 'write_date'])
+        return updated == len(ids)
+
+    # === LEDGER: potong poin secara atomik ===
+    def _ledger_deduct(self, amount, ticket, log_transaction=True):
+        """
+        Deduct `amount` from this balance in one conditional UPDATE (row lock,
+        only when the balance covers it) and, when log_transaction is set,
+        insert the matching point.transaction in the same statement.
+        Returns the new balance, or None when the balance is insufficient
+        (nothing is changed then).
+        """
+        self.ensure_one()
+        self.flush_recordset(['name'])
+        params = {
+            'id': self.id,
+            'amount': amount,
+            'uid': self.env.uid,
+            'ticket_id': ticket.id,
+            'customer_id': ticket.customer_name_id.id,
+            # used_point adalah Integer, sama seperti konversi ORM
+            'used_point': int(amount),
+            'problem_id': ticket.category.id,
+        }
+        query = """
+            WITH upd AS (
+                UPDATE point_name
+                   SET name = name - %(amount)s,
+                       write_uid = %(uid)s, write_date = (now() at time zone 'UTC')
+                 WHERE id = %(id)s AND name >= %(amount)s
+             RETURNING id, name
+            )"""
+        if log_transaction:
+            query += """, ins AS (
+                INSERT INTO point_transaction (ticket_id, customer_id, point_id, used_point, problem_ticket, date,
+                                               create_uid, create_date, write_uid, write_date)
+                SELECT %(ticket_id)s, %(customer_id)s, upd.id, %(used_point)s, %(problem_id)s,
+                       (now() at time zone 'UTC'), %(uid)s, (now() at time zone 'UTC'),
+                       %(uid)s, (now() at time zone 'UTC')
+                  FROM upd
+             RETURNING id
+            )
+            SELECT upd.name, (SELECT id FROM ins) FROM upd"""
+        else:
+            query += """
+            SELECT upd.name, NULL FROM upd"""
+        self.env.cr.execute(query, params)
+        row = self.env.cr.fetchone()
+        self.invalidate_recordset(['name', 'write_uid', 'write_date'])
+        if not row:
+            return None
+        if log_transaction:
+            self.env['point.transaction'].invalidate_model()
+            self.invalidate_model(['total_min_points'])
+        return row[0]
 
     # etest = fields.Char(string='etest')
 
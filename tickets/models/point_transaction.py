@@ -1,4 +1,4 @@
-from odoo import _, api, fields, models
+from odoo import _, api, fields, models, tools
 
 class PointTransaction(models.Model):
     _name = 'point.transaction'
@@ -9,4 +9,27 @@ class PointTransaction(models.Model):
     point_id = fields.Many2one('point.name', string='Customer Points')
     used_point = fields.Integer(string='Used Points', required=True)
     problem_ticket = fields.Many2one('problem.name', string='Problems', required=True)
-    date = fields.Datetime(string='Date', default=fields.Datetime.now)
\ No newline at end of file
+    date = fields.Datetime(string='Date', default=fields.Datetime.now)
+
+    def init(self):
+        # point.name.total_min_points: SUM per (customer, produk) saat dibaca
+        tools.create_index(self._cr, 'point_transaction_customer_problem_index',
+                           self._table, ['customer_id', 'problem_ticket'])
+
+    # === point.name.total_min_points (dihitung saat dibaca) ===
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['point.name'].invalidate_model(['total_min_points'])
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if {'customer_id', 'problem_ticket', 'used_point'}.intersection(vals):
+            self.env['point.name'].invalidate_model(['total_min_points'])
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env['point.name'].invalidate_model(['total_min_points'])
+        return res
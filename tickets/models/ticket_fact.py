@@ -0,0 +1,245 @@
+# tickets/models/ticket_fact.py
+from odoo import api, fields, models, tools
+import logging
+
+from .dashboard_cache import dashboard_cache
+
+_logger = logging.getLogger(__name__)
+
+
+class TicketDailyFact(models.Model):
+    _name = 'ticket.daily.fact'
+    _description = 'Daily Ticket Rollup (Dashboard Facts)'
+    _order = 'day desc, id'
+    _rec_name = 'day'
+
+    # --- Dimensions ---
+    day = fields.Date(string='Day', required=True, readonly=True, index=True)
+    category_id = fields.Many2one('problem.name', string='Kategori', readonly=True, ondelete='set null')
+    definition_id = fields.Many2one('definition.name', string='Definition', readonly=True, ondelete='set null')
+    priority = fields.Char(string='Priority', readonly=True)
+    sales_person_id = fields.Many2one('res.users', string='Sales Person', readonly=True, ondelete='set null')
+    technician_id = fields.Many2one('res.partner', string='Technician', readonly=True, ondelete='set null')
+    customer_id = fields.Many2one('res.partner', string='Customer', readonly=True, ondelete='set null')
+
+    # --- Measures ---
+    ticket_count = fields.Integer(string='Tickets', readonly=True)
+    response_count = fields.Integer(string='Responded Tickets', readonly=True)
+    sum_response_hours = fields.Float(string='Sum Response (Hours)', readonly=True)
+    resolution_count = fields.Integer(string='Resolved Tickets', readonly=True)
+    sum_resolution_hours = fields.Float(string='Sum Resolution (Hours)', readonly=True)
+    sum_min_point = fields.Float(string='Sum Ticket Usage', readonly=True)
+    rating_1 = fields.Integer(string='Rating Worst', readonly=True)
+    rating_2 = fields.Integer(string='Rating Bad', readonly=True)
+    rating_3 = fields.Integer(string='Rating Medium', readonly=True)
+    rating_4 = fields.Integer(string='Rating Good', readonly=True)
+    rating_5 = fields.Integer(string='Rating Excellent', readonly=True)
+
+    DIMENSIONS = [
+        ('day', 'date'), ('category_id', 'int4'), ('definition_id', 'int4'), ('priority', 'varchar'),
+        ('sales_person_id', 'int4'), ('technician_id', 'int4'), ('customer_id', 'int4'),
+    ]
+    MEASURES = [
+        ('ticket_count', 'int4'), ('response_count', 'int4'), ('sum_response_hours', 'float8'),
+        ('resolution_count', 'int4'), ('sum_resolution_hours', 'float8'), ('sum_min_point', 'float8'),
+        ('rating_1', 'int4'), ('rating_2', 'int4'), ('rating_3', 'int4'), ('rating_4', 'int4'), ('rating_5', 'int4'),
+    ]
+    RATING_MEASURES = {'worst': 'rating_1', 'bad': 'rating_2', 'medium': 'rating_3', 'good': 'rating_4', 'excellent': 'rating_5'}
+
+    # NULL pada dimensi dianggap sama (COALESCE) agar satu key = satu baris
+    KEY_NULL_DEFAULTS = {'int4': '0', 'varchar': "''", 'date': None}
+
+    @api.model
+    def _key_expressions(self):
+        """Unique key of a fact row: the dimensions, nullable ones wrapped in COALESCE."""
+        return [
+            name if self.KEY_NULL_DEFAULTS[sql_type] is None
+            else "COALESCE(%s, %s)" % (name, self.KEY_NULL_DEFAULTS[sql_type])
+            for name, sql_type in self.DIMENSIONS
+        ]
+
+    def init(self):
+        tools.create_index(self._cr, 'ticket_daily_fact_day_customer_index',
+                           self._table, ['day', 'customer_id'])
+        if not tools.index_exists(self._cr, 'ticket_daily_fact_key_uniq'):
+            # Baris lama bisa duplikat; <function rebuild> di data XML mengisinya lagi
+            self._cr.execute("DELETE FROM ticket_daily_fact")
+            tools.create_unique_index(self._cr, 'ticket_daily_fact_key_uniq',
+                                      self._table, self._key_expressions())
+        # Tabel revisi per hari lama (satu baris panas per hari); fingerprint kini dari baris fakta
+        self._cr.execute("DROP TABLE IF EXISTS ticket_daily_fact_revision")
+
+    # ========= Ticket Contribution =========
+    @api.model
+    def _ticket_contribution(self, ticket):
+        """(dimension key, measures) of one ticket, or None when it has no submitted_date."""
+        if not ticket.submitted_date:
+            return None
+        key = (
+            ticket.submitted_date.date(), ticket.category.id or None, ticket.definition.id or None,
+            ticket.priority or None, ticket.sales_person_id.id or None, ticket.technician.id or None,
+            ticket.customer_name_id.id or None,
+        )
+        measures = {'ticket_count': 1}
+        if ticket.progress_date:
+            measures['response_count'] = 1
+            measures['sum_response_hours'] = (ticket.progress_date - ticket.submitted_date).total_seconds() / 3600.0
+            if ticket.finish_date:
+                measures['resolution_count'] = 1
+                measures['sum_resolution_hours'] = (ticket.finish_date - ticket.progress_date).total_seconds() / 3600.0
+        if ticket.min_point:
+            measures['sum_min_point'] = ticket.min_point
+        if ticket.customer_rating in self.RATING_MEASURES:
+            measures[self.RATING_MEASURES[ticket.customer_rating]] = 1
+        return key, measures
+
+    @api.model
+    def _merge_deltas(self, old_contributions, new_contributions):
+        """Fold old/new contributions ({ticket_id: (key, measures)}) into {key: {measure: delta}}."""
+        deltas = {}
+        for contributions, sign in ((old_contributions, -1), (new_contributions, 1)):
+            for contribution in contributions.values():
+                if not contribution:
+                    continue
+                key, measures = contribution
+                delta = deltas.setdefault(key, {})
+                for measure, value in measures.items():
+                    delta[measure] = delta.get(measure, 0) + sign * value
+        # Perubahan yang saling meniadakan tidak perlu ditulis
+        return {key: delta for key, delta in deltas.items() if any(delta.values())}
+
+    @api.model
+    def _apply_deltas(self, deltas):
+        """
+        Add measure deltas to the fact rows of each key in one INSERT ... ON
+        CONFLICT DO UPDATE on the unique key (safe against concurrent inserts
+        of the same key), then drop emptied rows.
+        """
+        if not deltas:
+            return
+        keys = list(deltas)
+        dim_names = [name for name, _type in self.DIMENSIONS]
+        measure_names = [name for name, _type in self.MEASURES]
+        params = [[key[i] for key in keys] for i in range(len(dim_names))]
+        params += [[deltas[key].get(measure, 0) for key in keys] for measure in measure_names]
+        unnest_args = ", ".join("%%s::%s[]" % sql_type for _name, sql_type in self.DIMENSIONS + self.MEASURES)
+        query = """
+            INSERT INTO ticket_daily_fact ({columns}, create_uid, create_date, write_uid, write_date)
+            SELECT v.*, %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+              FROM unnest({unnest_args}) AS v({columns})
+            ON CONFLICT ({key}) DO UPDATE
+               SET {increments}, write_uid = EXCLUDED.write_uid, write_date = EXCLUDED.write_date
+        """.format(
+            unnest_args=unnest_args,
+            columns=", ".join(dim_names + measure_names),
+            key=", ".join(self._key_expressions()),
+            increments=", ".join("%s = ticket_daily_fact.%s + EXCLUDED.%s" % (name, name, name)
+                                 for name in measure_names),
+        )
+        uid = self.env.uid
+        self.flush_model()
+        self.env.cr.execute(query, [uid, uid] + params)
+        days = {key[0] for key in keys}
+        self.env.cr.execute("DELETE FROM ticket_daily_fact WHERE day IN %s AND ticket_count <= 0",
+                            (tuple(days),))
+        self.invalidate_model()
+        # Buang response dashboard yang mencakup hari yang berubah (worker ini)
+        dashboard_cache.invalidate_days(self.env.cr.dbname, {fields.Date.to_string(day) for day in days})
+
+    # ========= Full Rebuild (repair) =========
+    @api.model
+    def rebuild(self):
+        """
+        Recreate all fact rows from ticket_name with one INSERT ... SELECT ... GROUP BY.
+        Repairs drift the incremental path cannot see (e.g. a customer's
+        salesperson changing on res.partner).
+        """
+        self.env['ticket.name'].flush_model()
+        rating_columns = ", ".join(
+            "COUNT(*) FILTER (WHERE t.customer_rating = '%s')" % rating
+            for rating in self.RATING_MEASURES)
+        self.env.cr.execute("DELETE FROM ticket_daily_fact")
+        self.env.cr.execute("""
+            INSERT INTO ticket_daily_fact (
+                day, category_id, definition_id, priority, sales_person_id, technician_id, customer_id,
+                ticket_count, response_count, sum_response_hours, resolution_count, sum_resolution_hours,
+                sum_min_point, rating_1, rating_2, rating_3, rating_4, rating_5,
+                create_uid, create_date, write_uid, write_date)
+            SELECT t.submitted_date::date, t.category, t.definition, NULLIF(t.priority, ''),
+                   t.sales_person_id, t.technician, t.customer_name_id,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE t.progress_date IS NOT NULL),
+                   COALESCE(SUM(EXTRACT(EPOCH FROM t.progress_date - t.submitted_date) / 3600.0), 0),
+                   COUNT(*) FILTER (WHERE t.progress_date IS NOT NULL AND t.finish_date IS NOT NULL),
+                   COALESCE(SUM(EXTRACT(EPOCH FROM t.finish_date - t.progress_date) / 3600.0), 0),
+                   COALESCE(SUM(t.min_point), 0),
+                   {rating_columns},
+                   %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC')
+              FROM ticket_name t
+             WHERE t.submitted_date IS NOT NULL
+               AND t.analytics_counted IS TRUE
+          GROUP BY 1, 2, 3, 4, 5, 6, 7
+        """.format(rating_columns=rating_columns), (self.env.uid, self.env.uid))
+        _logger.info(f"Ticket daily facts rebuilt: {self.env.cr.rowcount} rows.")
+        self.invalidate_model()
+        return True
+
+    @api.model
+    def _cron_rebuild(self):
+        self.rebuild()
+
+    # ========= Dashboard =========
+    @api.model
+    def _range_fingerprint(self, start_date, end_date):
+        """
+        Cheap version of the facts in a date range, read from the fact rows
+        themselves (no shared counter row to lock): row count, latest
+        write_date and the measure sums. The sums also catch a change committed
+        by a transaction that started before the current MAX(write_date).
+        """
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT COUNT(*), MAX(write_date), COALESCE(SUM(ticket_count), 0), COALESCE(SUM(response_count), 0),
+                   COALESCE(SUM(resolution_count), 0), COALESCE(SUM(sum_min_point), 0),
+                   COALESCE(SUM(sum_response_hours), 0), COALESCE(SUM(sum_resolution_hours), 0)
+              FROM ticket_daily_fact
+             WHERE day BETWEEN %s AND %s
+        """, (start_date, end_date))
+        return ":".join(str(value or '') for value in self.env.cr.fetchone())
+
+    @api.model
+    def _get_dashboard_data(self, start_date, end_date, customer_sort='desc', top_n=20):
+        """Same result as ticket.name.get_dashboard_data(), read from the daily rollup."""
+        Ticket = self.env['ticket.name']
+        self.flush_model()
+        where = "day BETWEEN %s AND %s"
+
+        def fetch(select, group_by, having='', order='', params=()):
+            self.env.cr.execute(
+                "SELECT %s FROM ticket_daily_fact WHERE %s GROUP BY %s %s %s"
+                % (select, where, group_by, having, order), [start_date, end_date] + list(params))
+            return self.env.cr.fetchall()
+
+        rating_columns = ", ".join("COALESCE(SUM(%s), 0)" % measure for measure in self.RATING_MEASURES.values())
+        self.env.cr.execute("SELECT %s FROM ticket_daily_fact WHERE %s" % (rating_columns, where), [start_date, end_date])
+        ratings = dict(zip(Ticket.DASHBOARD_RATING_STARS.values(), self.env.cr.fetchone()))
+        sort = 'ASC' if customer_sort == 'asc' else 'DESC'
+
+        return {
+            'problem': Ticket._dashboard_named('problem.name', fetch(
+                'category_id, SUM(ticket_count)', 'category_id'), "Uncategorized"),
+            'definition': Ticket._dashboard_named('definition.name', fetch(
+                'definition_id, SUM(ticket_count)', 'definition_id'), "Undefined"),
+            'priority': {priority or "None": count for priority, count in fetch(
+                'priority, SUM(ticket_count)', 'priority')},
+            'rating': ratings,
+            'sales': Ticket._dashboard_named('res.users', fetch(
+                'sales_person_id, SUM(sum_response_hours) / SUM(response_count)', 'sales_person_id',
+                'HAVING sales_person_id IS NOT NULL AND SUM(response_count) > 0'), "Unknown"),
+            'technician': Ticket._dashboard_named('res.partner', fetch(
+                'technician_id, SUM(sum_resolution_hours) / SUM(resolution_count)', 'technician_id',
+                'HAVING technician_id IS NOT NULL AND SUM(resolution_count) > 0'), "Unknown"),
+            'customer_points': Ticket._dashboard_named('res.partner', fetch(
+                'customer_id, SUM(sum_min_point)', 'customer_id', 'HAVING SUM(sum_min_point) != 0',
+                'ORDER BY 2 %s LIMIT %%s' % sort, [top_n]), "Unknown"),
+        }
@@ -0,0 +1,38 @@
+/** @odoo-module **/
+
+import { registry } from "@web/core/registry";
+import { ProgressBarField } from "@web/views/fields/progress_bar/progress_bar_field";
+import { onMounted, onWillUnmount } from "@odoo/owl";
+
+// Polling interval (ms) while a background analytics job is queued/running
+const POLL_INTERVAL = 2000;
+const ACTIVE_STATES = ["queued", "running"];
+
+// Progress bar that reloads its record until the related analytics.job finishes
+export class JobProgressField extends ProgressBarField {
+    setup() {
+        super.setup();
+        this.timer = null;
+        onMounted(() => {
+            this.timer = setInterval(() => this.poll(), POLL_INTERVAL);
+        });
+        onWillUnmount(() => clearInterval(this.timer));
+    }
+
+    get jobState() {
+        const data = this.props.record.data;
+        // analytics.job form uses `state`, records with the job mixin use `job_state`
+        return "job_state" in data ? data.job_state : data.state;
+    }
+
+    async poll() {
+        const record = this.props.record;
+        if (!ACTIVE_STATES.includes(this.jobState) || (await record.isDirty())) {
+            return;
+        }
+        await record.load();
+        record.model.notify();
+    }
+}
+
+registry.category("fields").add("job_progress", JobProgressField);
@@ -31,7 +31,9 @@ export class KmeansScatterDashboard extends Component {
         this.state = useState({
             loading: true,
             error: null,
-            allResults: [], // Holds raw data fetched from kmeans.result
+            scatter: null, // Downsampled payload from intelligent.kmeans.get_scatter_data()
+            viewport: null, // [xmin, xmax, ymin, ymax] when zoomed in, null = whole run
+            samplingMode: 'sample', // 'sample' (stratified) or 'grid' (binned with density)
             plotData: null, // Holds data formatted for the *current* chart based on selection
             runInfo: { // Information passed from the triggering action's context
                 runId: this.props.action?.context?.kmeans_run_id, // Get the ID of the K-Means run
@@ -80,7 +82,7 @@ export class KmeansScatterDashboard extends Component {
         onMounted(() => {
             // Wait a brief moment for the DOM to be fully stable after loading/rendering
             setTimeout(() => {
-                if (!this.state.loading && !this.state.error && this.state.allResults.length > 0) {
+                if (!this.state.loading && !this.state.error && this.state.scatter?.total > 0) {
                     console.log("onMounted: DOM should be ready, attempting initial renderChart().");
                     this.updatePlotData();
                     this.renderChart();
@@ -98,7 +100,8 @@ export class KmeansScatterDashboard extends Component {
     }
 
     /**
-     * Loads ALL cluster results for the current K-Means run, including the record ID itself.
+     * Loads the two selected features of the run, downsampled per cluster on the server
+     * (full detail only when the zoomed viewport holds few enough points).
      */
     async loadResultData() {
         if (!this.state.runInfo.runId) {
@@ -106,26 +109,21 @@ export class KmeansScatterDashboard extends Component {
              console.error(this.state.error);
              return;
         }
-        // Fetch 'id' along with other necessary fields
-        const fieldsToFetch = ['id', 'cluster_id', 'customer_id'].concat(this.state.features.map(f => f.id));
         try {
-            console.log(`Fetching kmeans.result for run_id: ${this.state.runInfo.runId} with fields:`, fieldsToFetch);
-            const results = await this.orm.searchRead(
-                'kmeans.result',
-                [['run_id', '=', this.state.runInfo.runId]],
-                fieldsToFetch,
-                { order: 'id' } // Order by ID for consistency
-            );
-            console.log(`Fetched ${results.length} results. Example:`, results[0]);
-            if (!results || results.length === 0) {
+            const scatter = await this.orm.call('intelligent.kmeans', 'get_scatter_data', [
+                [this.state.runInfo.runId], this.state.selectedXFeature, this.state.selectedYFeature,
+            ], {
+                mode: this.state.samplingMode,
+                viewport: this.state.viewport,
+                packed: true,
+            });
+            if (!scatter.total && !this.state.viewport) {
                 this.state.error = `No cluster results found for K-Means Run ID ${this.state.runInfo.runId}. Run 'Step 2' first.`;
                 return;
             }
-            this.state.allResults = results;
-             if (results.length > 0 && results[0].id === undefined) {
-                 console.error(">>> id field was NOT fetched! <<<");
-                 this.state.error = "Failed to fetch result record ID.";
-             }
+            this.unpackColumns(scatter);
+            console.log(`Scatter data: ${scatter.returned} of ${scatter.total} points (${scatter.mode}).`);
+            this.state.scatter = scatter;
         } catch (e) {
             this.state.error = `Failed to load cluster results: ${e.message || e}`;
             console.error(this.state.error, e);
@@ -133,30 +131,87 @@ export class KmeansScatterDashboard extends Component {
     }
 
     /**
-     * Prepares plotData including {x, y, cluster_id, resultId}.
+     * Decodes the packed base64 Float32Array (column after column) into scatter[column] arrays.
+     */
+    unpackColumns(scatter) {
+        if (!scatter.packed) return;
+        const bytes = Uint8Array.from(atob(scatter.packed), c => c.charCodeAt(0));
+        const values = new Float32Array(bytes.buffer);
+        const n = scatter.returned || 0;
+        scatter.columns.forEach((name, i) => {
+            scatter[name] = values.subarray(i * n, (i + 1) * n);
+        });
+        delete scatter.packed;
+    }
+
+    /**
+     * Prepares plotData including {x, y, cluster_id, customerName, count}.
      */
     updatePlotData() {
-        if (!this.state.allResults.length) { this.state.plotData = null; return; }
+        const scatter = this.state.scatter;
+        if (!scatter || !scatter.returned) { this.state.plotData = null; return; }
         const xKey = this.state.selectedXFeature;
         const yKey = this.state.selectedYFeature;
+        const points = [];
+        for (let i = 0; i < scatter.returned; i++) {
+            points.push({
+                x: scatter.x[i],
+                y: scatter.y[i],
+                cluster_id: Math.round(scatter.cluster[i]),
+                // Nama customer (mode full/sample) atau jumlah customer dalam bin (mode grid)
+                customerName: scatter.customers ? scatter.customers[i] : null,
+                count: scatter.count ? Math.round(scatter.count[i]) : 1,
+            });
+        }
         this.state.plotData = {
-            points: this.state.allResults.map(r => ({
-                x: r[xKey],
-                y: r[yKey],
-                cluster_id: r.cluster_id,
-                resultId: r.id, // Store the ID of the kmeans.result record itself
-                // Store Customer Name for tooltip
-                customerName: r.customer_id ? r.customer_id[1] : 'Unknown Customer'
-            })),
+            points,
             xLabel: FEATURE_DICT[xKey] || xKey,
             yLabel: FEATURE_DICT[yKey] || yKey,
-            clusterNames: [...new Set(this.state.allResults.map(r => r.cluster_id))].sort((a, b) => a - b).map(id => `Cluster ${id}`)
+            clusterNames: scatter.clusters.map(id => `Cluster ${id}`),
+            subtitle: scatter.mode === 'full'
+                ? `${scatter.total} customers`
+                : `${scatter.returned} of ${scatter.total} customers (${scatter.mode === 'grid' ? 'density bins' : 'stratified sample'})`,
         };
-        console.log("Plot data updated. Example point:", this.state.plotData.points[0]);
+    }
+
+    async reload() {
+        this.state.loading = true;
+        await this.loadResultData();
+        this.state.loading = false;
+        // Canvas dirender ulang setelah template update
+        setTimeout(() => {
+            this.updatePlotData();
+            this.renderChart();
+        }, 0);
     }
 
     /**
-     * Prepares Chart.js datasets. Point data includes resultId and customerName.
+     * Double click zooms in 2x around the clicked position; the server returns
+     * full detail once the viewport holds few enough points.
+     */
+    onCanvasDblClick(ev) {
+        if (!this.chartInstance) return;
+        const { x: xScale, y: yScale } = this.chartInstance.scales;
+        const cx = xScale.getValueForPixel(ev.offsetX);
+        const cy = yScale.getValueForPixel(ev.offsetY);
+        const halfX = (xScale.max - xScale.min) / 4;
+        const halfY = (yScale.max - yScale.min) / 4;
+        this.state.viewport = [cx - halfX, cx + halfX, cy - halfY, cy + halfY];
+        this.reload();
+    }
+
+    onResetZoom() {
+        this.state.viewport = null;
+        this.reload();
+    }
+
+    onChangeSampling(ev) {
+        this.state.samplingMode = ev.target.value;
+        this.reload();
+    }
+
+    /**
+     * Prepares Chart.js datasets. Point data includes customerName and count.
      */
      prepareChartJsData(plotData) {
         if (!plotData || !plotData.points || !plotData.clusterNames) return null;
@@ -164,14 +219,16 @@ export class KmeansScatterDashboard extends Component {
         const colors = ['rgba(255, 99, 132, 0.7)', 'rgba(54, 162, 235, 0.7)', 'rgba(255, 206, 86, 0.7)', 'rgba(75, 192, 192, 0.7)', 'rgba(153, 102, 255, 0.7)', 'rgba(255, 159, 64, 0.7)', 'rgba(199, 199, 199, 0.7)', 'rgba(83, 102, 255, 0.7)', 'rgba(40, 167, 69, 0.7)', 'rgba(214, 51, 132, 0.7)'];
         plotData.clusterNames.forEach((name, index) => {
             const clusterId = parseInt(name.split(' ')[1]);
-            // Keep the full point object {x, y, cluster_id, resultId, customerName}
+            // Keep the full point object {x, y, cluster_id, customerName, count}
             const pointsInCluster = plotData.points.filter(p => p.cluster_id === clusterId);
             if (pointsInCluster.length > 0) {
                 datasets.push({
                     label: name,
                     data: pointsInCluster, // Pass the full point objects
                     backgroundColor: colors[index % colors.length],
-                    pointRadius: 4, pointHoverRadius: 6,
+                    // Bin dengan banyak customer digambar lebih besar (mode grid)
+                    pointRadius: pointsInCluster.map(p => Math.min(3 + Math.log2(p.count), 12)),
+                    pointHoverRadius: 6,
                 });
             }
         });
@@ -235,6 +292,7 @@ export class KmeansScatterDashboard extends Component {
                     },
                     plugins: {
                         title: { display: true, text: `Scatter Plot: ${this.state.plotData.yLabel} vs ${this.state.plotData.xLabel}`, font: { size: 16 } },
+                        subtitle: { display: true, text: this.state.plotData.subtitle },
                         legend: { position: 'top', labels: { boxWidth: 12, font: { size: 12 } } },
                         tooltip: {
                             enabled: true, backgroundColor: 'rgba(0, 0, 0, 0.8)', titleFont: { weight: 'bold' }, bodyFont: { size: 11 }, padding: 8,
@@ -242,7 +300,7 @@ export class KmeansScatterDashboard extends Component {
                                 label: (context) => {
                                     const dataPoint = context.dataset.data[context.dataIndex];
                                     const clusterLabel = context.dataset.label || '';
-                                    const customerName = dataPoint?.customerName || 'Customer';
+                                    const customerName = dataPoint?.customerName || `${dataPoint?.count || 1} customer(s)`;
                                     const xVal = context.parsed.x?.toFixed(3);
                                     const yVal = context.parsed.y?.toFixed(3);
                                     return [`${clusterLabel}: ${customerName}`, `(${this.state.plotData.xLabel}: ${xVal}, ${this.state.plotData.yLabel}: ${yVal})`];
@@ -258,7 +316,7 @@ export class KmeansScatterDashboard extends Component {
                         x: { title: { display: true, text: this.state.plotData.xLabel, font: { weight: 'bold' } }, grid: { color: 'rgba(0, 0, 0, 0.05)' } },
                         y: { beginAtZero: false, title: { display: true, text: this.state.plotData.yLabel, font: { weight: 'bold' } }, grid: { color: 'rgba(0, 0, 0, 0.05)' } }
                     },
-                    animation: { duration: 400 }
+                    animation: false
                 }
             });
         } catch(e) { this.state.error = `Chart.js rendering error: ${e.message || e}`; console.error(e); }
@@ -275,15 +333,16 @@ export class KmeansScatterDashboard extends Component {
     }
 
     // --- Event Handlers for Select Dropdowns ---
+    // Fitur lain = data lain dari server (hanya dua kolom yang dikirim)
     onChangeX(ev) {
         this.state.selectedXFeature = ev.target.value;
-        this.updatePlotData(); // Re-prepare data based on the new selection
-        this.renderChart();    // Re-render the chart with the updated data/axes
+        this.state.viewport = null;
+        this.reload();
     }
     onChangeY(ev) {
         this.state.selectedYFeature = ev.target.value;
-        this.updatePlotData(); // Re-prepare data
-        this.renderChart();    // Re-render chart
+        this.state.viewport = null;
+        this.reload();
     }
 
     // --- Navigation ---
@@ -315,7 +374,7 @@ KmeansScatterDashboard.template = xml/* xml */`
                  <h2 class="h5 d-inline-block mb-0 align-middle">K-Means Scatter Plot</h2>
                  <span t-if="state.runInfo.runName" class="ms-2 text-muted small fst-italic"><t t-esc="state.runInfo.runName"/></span>
             </div>
-            <div class="d-flex align-items-center" t-if="!state.loading and !state.error and state.allResults.length > 0">
+            <div class="d-flex align-items-center" t-if="!state.error and state.scatter">
                  <label for="scatterXSelect" class="col-form-label col-form-label-sm fw-bold me-1 ms-3">X-Axis:</label>
                  <select id="scatterXSelect" class="form-select form-select-sm me-3 shadow-sm" style="width: 150px;" aria-label="Select X-axis feature" t-on-change="onChangeX">
                     <t t-foreach="state.features" t-as="feature" t-key="feature.id">
@@ -332,6 +391,14 @@ KmeansScatterDashboard.template = xml/* xml */`
                         </option>
                     </t>
                  </select>
+                 <label for="scatterSamplingSelect" class="col-form-label col-form-label-sm fw-bold me-1 ms-3">Downsampling:</label>
+                 <select id="scatterSamplingSelect" class="form-select form-select-sm shadow-sm" style="width: 170px;" aria-label="Select downsampling" t-on-change="onChangeSampling">
+                    <option value="sample" t-att-selected="state.samplingMode === 'sample'">Stratified Sample</option>
+                    <option value="grid" t-att-selected="state.samplingMode === 'grid'">Density Grid</option>
+                 </select>
+                 <button t-if="state.viewport" class="btn btn-secondary btn-sm ms-3" title="Show the whole run" t-on-click="onResetZoom">
+                    <i class="fa fa-search-minus me-1" role="img" aria-label="Reset Zoom"/> Reset Zoom
+                 </button>
             </div>
         </div>
         <div class="flex-grow-1 d-flex flex-column">
@@ -341,12 +408,13 @@ KmeansScatterDashboard.template = xml/* xml */`
             <div t-if="state.error &amp;&amp; !state.loading" class="alert alert-danger mx-3 flex-grow-0" role="alert">
                  <i class="fa fa-exclamation-triangle me-2" role="img" aria-label="Error"/>Error: <t t-esc="state.error"/>
             </div>
-            <div t-if="!state.loading and !state.error and state.allResults.length > 0" class="bg-white border rounded p-3 shadow-sm mx-3 mb-3" style="min-height: 400px;">
+            <div t-if="!state.loading and !state.error and state.scatter" class="bg-white border rounded p-3 shadow-sm mx-3 mb-3" style="min-height: 400px;">
+                 <div class="small text-muted mb-1">Double click to zoom in.</div>
                  <div class="w-90 h-90" style="position: relative; min-height: 600px;">
-                    <canvas t-ref="scatterChartCanvas" class="w-90 h-90" aria-label="Scatter Plot Canvas"></canvas>
+                    <canvas t-ref="scatterChartCanvas" class="w-90 h-90" aria-label="Scatter Plot Canvas" t-on-dblclick="onCanvasDblClick"></canvas>
                 </div>
             </div>
-             <div t-if="!state.loading and !state.error and !state.allResults.length === 0" class="flex-grow-1 d-flex justify-content-center align-items-center text-muted">
+             <div t-if="!state.loading and !state.error and !state.scatter" class="flex-grow-1 d-flex justify-content-center align-items-center text-muted">
                 No cluster results were found for this run. Please run Step 2 first on the K-Means Run screen.
             </div>
              <div style="height: 20px;"></div> </div>
@@ -143,95 +143,18 @@ class TicketDashboard extends Component {
 
     async renderCharts() {
         try {
-            const baseDomain = [
-                ['submitted_date', '>=', this.state.startDate + ' 00:00:00'],
-                ['submitted_date', '<=', this.state.endDate + ' 23:59:59'],
-            ];
-
-            const tickets = await this.orm.searchRead("ticket.name", baseDomain, [
-                "category", "definition", "priority", "customer_rating",
-                "submitted_date", "progress_date", "finish_date", 
-                "sales_person_id", "technician", "customer_name_id", "min_point"
+            // Semua agregasi dihitung di server (grouped SQL), payload hanya beberapa KB
+            const TOP_N = 20;
+            const data = await this.orm.call("ticket.name", "get_dashboard_data", [
+                this.state.startDate, this.state.endDate, this.state.customerSort, TOP_N,
             ]);
-
-            // --- Data Processing ---
-            const problemCounts = {};
-            const definitionCounts = {};
-            const priorityCounts = {};
-            const ratingCounts = { "1": 0, "2": 0, "3": 0, "4": 0, "5": 0 };
-            const salesPerf = {};
-            const techPerf = {};
-            const customerPoints = {};
-            
-            tickets.forEach(t => {
-                const cat = t.category ? t.category[1] : "Uncategorized";
-                problemCounts[cat] = (problemCounts[cat] || 0) + 1;
-                const def = t.definition ? t.definition[1] : "Undefined";
-                definitionCounts[def] = (definitionCounts[def] || 0) + 1;
-                const p = t.priority || "None";
-                priorityCounts[p] = (priorityCounts[p] || 0) + 1;
-                
-                switch (t.customer_rating) {
-                    case "worst": ratingCounts["1"]++; break;
-                    case "bad": ratingCounts["2"]++; break;
-                    case "medium": ratingCounts["3"]++; break;
-                    case "good": ratingCounts["4"]++; break;
-                    case "excellent": ratingCounts["5"]++; break;
-                }
-
-                if (t.submitted_date && t.progress_date && t.sales_person_id) {
-                    const sales = t.sales_person_id[1];
-                    const delta = (new Date(t.progress_date) - new Date(t.submitted_date)) / (1000 * 60 * 60);
-                    if (!salesPerf[sales]) salesPerf[sales] = [];
-                    salesPerf[sales].push(delta);
-                }
-
-                if (t.progress_date && t.finish_date && t.technician) {
-                    const tech = t.technician[1];
-                    const delta = (new Date(t.finish_date) - new Date(t.progress_date)) / (1000 * 60 * 60);
-                    if (!techPerf[tech]) techPerf[tech] = [];
-                    techPerf[tech].push(delta);
-                }
-
-                const cust = t.customer_name_id ? t.customer_name_id[1] : "Unknown";
-                if (cust && t.min_point) {
-                    customerPoints[cust] = (customerPoints[cust] || 0) + t.min_point;
-                }
-            });
-
-            const salesAvg = {};
-            Object.keys(salesPerf).forEach(s => {
-                const vals = salesPerf[s];
-                salesAvg[s] = vals.reduce((a, b) => a + b, 0) / vals.length;
-            });
-
-            const techAvg = {};
-            Object.keys(techPerf).forEach(te => {
-                const vals = techPerf[te];
-                techAvg[te] = vals.reduce((a, b) => a + b, 0) / vals.length;
-            });
-
-            // --- Customer Points: Filter Top N berdasarkan Sort State ---
-            const customerPointsEntries = Object.entries(customerPoints);
-            const TOP_N = 20; 
-            
-            let filteredEntries;
-
-            if (this.state.customerSort === 'asc') {
-                // Ambil 20 terendah (Lowest) dari total data
-                filteredEntries = customerPointsEntries
-                    .sort((a, b) => a[1] - b[1]) // Sortir Lowest to Highest
-                    .slice(0, TOP_N); // Ambil 20 teratas (yang merupakan 20 terendah)
-                
-            } else {
-                // Ambil 20 tertinggi (Highest) dari total data (Default)
-                filteredEntries = customerPointsEntries
-                    .sort((a, b) => b[1] - a[1]) // Sortir Highest to Lowest
-                    .slice(0, TOP_N); // Ambil 20 teratas (yang merupakan 20 tertinggi)
-            }
-            
-            const topNCustomerPoints = Object.fromEntries(filteredEntries);
-
+            const problemCounts = data.problem;
+            const definitionCounts = data.definition;
+            const priorityCounts = data.priority;
+            const ratingCounts = data.rating;
+            const salesAvg = data.sales;
+            const techAvg = data.technician;
+            const topNCustomerPoints = data.customer_points;
 
             // --- Render Charts ---
             this.renderBarChart(this.problemChartRef, "Problem Distribution (Ticket Count)", problemCounts, 'category', false);
@@ -0,0 +1,115 @@
+# tickets/tests/test_ticket_roles_benchmark.py
+import logging
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_SIZE = 1000
+SMALL_SIZE = 10
+
+
+@tagged('-standard', 'post_install', '-at_install', 'tickets_benchmark')
+class TestTicketRolesBenchmark(TransactionCase):
+    """
+    Bulk create/write latency of ticket.name, with the role checks resolved
+    once per call ("after") and with one role check per record ("before").
+    Not part of the standard suite, run with: --test-tags tickets_benchmark
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env = cls.env(context=dict(cls.env.context, tracking_disable=True, mail_create_nolog=True))
+        cls.user = cls.env['res.users'].create({
+            'name': 'Ticket Benchmark Admin',
+            'login': 'ticket_benchmark_admin',
+            'groups_id': [(6, 0, [cls.env.ref('base.group_user').id, cls.env.ref('tickets.group_admin').id])],
+        })
+        cls.customer = cls.env['res.partner'].create({'name': 'Benchmark Customer'})
+        cls.category = cls.env['problem.name'].create({'name': 'Benchmark Category'})
+        cls.definition = cls.env['definition.name'].create({
+            'name': 'Benchmark Definition', 'service_title': cls.category.id,
+            'priority': 'low', 'complexity': 'low',
+        })
+        cls.env['point.name'].create({
+            'name': 10 ** 9, 'customer_id': cls.customer.id, 'product_point': cls.category.id,
+        })
+        cls.progress = cls.env['state.name'].search([('name', '=', 'Progress')], limit=1) \
+            or cls.env['state.name'].create({'name': 'Progress'})
+
+    def _measure(self, func):
+        """(seconds, SQL queries) of func()."""
+        self.env.flush_all()
+        queries = self.env.cr.sql_log_count
+        started = time.perf_counter()
+        func()
+        self.env.flush_all()
+        return time.perf_counter() - started, self.env.cr.sql_log_count - queries
+
+    def _create_write(self, size):
+        """(create seconds, create queries, write seconds, write queries) for `size` tickets."""
+        Ticket = self.env['ticket.name'].with_user(self.user)
+        vals_list = [{
+            'customer_name_id': self.customer.id,
+            'category': self.category.id,
+            'definition': self.definition.id,
+            'problem_description': f"Benchmark {i}",
+        } for i in range(size)]
+        tickets = Ticket.browse()
+
+        def create():
+            nonlocal tickets
+            tickets = Ticket.create(vals_list)
+
+        create_seconds, create_queries = self._measure(create)
+        self.assertEqual(len(tickets), size)
+        write_seconds, write_queries = self._measure(lambda: tickets.write({
+            'states': self.progress.id, 'problem_description': "Benchmark (edited)",
+        }))
+        return create_seconds, create_queries, write_seconds, write_queries
+
+    def _run(self, size, per_record=False):
+        """
+        _create_write(size) + number of _has_ticket_role calls. per_record
+        replays the old behaviour: one has_group() per record in write.
+        """
+        TicketClass = type(self.env['ticket.name'])
+        original_role = TicketClass._has_ticket_role
+        original_write = TicketClass.write
+        calls = []
+
+        def has_ticket_role(model, role):
+            calls.append(role)
+            return original_role(model, role)
+
+        def write_checking_each_record(records, vals):
+            for record in records:
+                record.env.user.has_group('tickets.group_customer_only')
+            return original_write(records, vals)
+
+        with ExitStack() as stack:
+            stack.enter_context(patch.object(TicketClass, '_has_ticket_role', has_ticket_role))
+            if per_record:
+                stack.enter_context(patch.object(TicketClass, 'write', write_checking_each_record))
+            return self._create_write(size) + (len(calls),)
+
+    def test_bulk_create_write_latency(self):
+        _c, _cq, _w, small_write_queries, _r = self._run(SMALL_SIZE)
+        before = self._run(BENCHMARK_SIZE, per_record=True)
+        after = self._run(BENCHMARK_SIZE)
+
+        for label, (create_s, create_q, write_s, write_q, role_checks) in (('before', before), ('after', after)):
+            _logger.info(
+                f"ticket.name x{BENCHMARK_SIZE} ({label}): create {create_s * 1000:.0f} ms / {create_q} queries, "
+                f"write {write_s * 1000:.0f} ms / {write_q} queries, {role_checks} role check(s).")
+
+        # Role di-resolve sekali per create/write/constraint, bukan per record
+        self.assertLess(after[4], 10)
+        # Write massal: jumlah query tidak boleh tumbuh dengan jumlah record
+        self.assertLessEqual(after[3], small_write_queries * 2,
+                             f"bulk write of {BENCHMARK_SIZE} tickets issued {after[3]} queries "
+                             f"vs {small_write_queries} for {SMALL_SIZE}")